@@ -1,30 +1,58 @@
-import pandas as pd
+import argparse
 import sys
 import os
 
 # Adjust path to import from the src directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.utils.file_io import load_dataframe, save_dataframe
+from src.utils.shuffle import DEFAULT_CHUNK_ROWS, external_shuffle, new_seed, save_shuffle_record
 
 def main():
     """
     Main function to shuffle the original registration data.
     """
-    input_file = "data/input/RegistrationData_Original.xlsx"
-    output_file = "data/input/RegistrationData.xlsx"
+    parser = argparse.ArgumentParser(description="Shuffle the rows of the registration data.")
+    parser.add_argument("--input", default="data/input/RegistrationData_Original.xlsx",
+                        help="Original registration data (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--output", default="data/input/RegistrationData.xlsx",
+                        help="Where to write the shuffled data; the format follows the extension.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for a reproducible shuffle; a new one is drawn and recorded if omitted.")
+    parser.add_argument("--external", action="store_true",
+                        help="Shuffle a CSV or Parquet file in chunks through temporary files instead of in memory.")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows held in memory at a time by --external; part of what reproduces the shuffle.")
+    parser.add_argument("--tmp-dir", default=None, help="Directory for the temporary files of --external.")
+    args = parser.parse_args()
+    input_file = args.input
+    output_file = args.output
+    seed = args.seed if args.seed is not None else new_seed()
 
     print("--- Starting Registration Data Randomization ---")
-    
+
+    if args.external:
+        try:
+            record = external_shuffle(input_file, output_file, seed, chunk_rows=args.chunk_rows, tmp_dir=args.tmp_dir)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Error: {e} Aborting.")
+            return
+        save_shuffle_record(output_file, record)
+        print(f"\nShuffled {record['rows']} rows with seed {seed} and chunks of {args.chunk_rows} rows.")
+        print(f"Shuffled data saved to '{output_file}'")
+        return
+
     df = load_dataframe(input_file)
     if df is None or df.empty:
         print("Input file is empty or could not be read. Aborting.")
         return
 
     # Shuffle the DataFrame rows and reset the index
-    df_randomized = df.sample(frac=1).reset_index(drop=True)
+    df_randomized = df.sample(frac=1, random_state=seed).reset_index(drop=True)
     
     save_dataframe(df_randomized, output_file)
+    save_shuffle_record(output_file, {"method": "in_memory", "seed": seed, "rows": len(df), "input": input_file})
     print("\nRandomization process completed successfully.")
+    print(f"Seed {seed} recorded in the shuffle record next to the output.")
     print(f"Shuffled data saved to '{output_file}'")
 
 if __name__ == "__main__":
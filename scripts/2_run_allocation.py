@@ -1,34 +1,108 @@
+import argparse
 import sys
 import os
 
 # Adjust path to import from the src directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.utils.file_io import load_dataframe, save_dataframe
-from src.allocator.processor import AddDropProcessor
+from src.allocator.processor import AddDropProcessor, ENGINES
+from src.allocator.snapshot import AllocationSnapshot
+from src.allocator.trace import TraceRecorder
+from src.verifier.optimality import OptimalityChecker
+from src.utils.helpers import REGISTRATION_USECOLS, SEATS_USECOLS
+from src.utils.events import add_event_args, event_log_from_args
+from src.utils.cache import add_cache_args, cache_from_args
 
 def main():
     """
     Main function to run the course allocation algorithm.
     """
-    seats_file = "data/input/ElectiveSeats.xlsx"
-    registration_file = "data/input/RegistrationData.xlsx"
-    output_file = "data/output/Result.xlsx"
+    parser = argparse.ArgumentParser(description="Run the add-drop course allocation.")
+    parser.add_argument("--seats", default="data/input/ElectiveSeats.xlsx",
+                        help="Elective seat file (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--registrations", default="data/input/RegistrationData.xlsx",
+                        help="Registration data (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--output", default=None,
+                        help="Where to write the results; the format follows the extension. "
+                             "Defaults to data/output/Result.xlsx, and is required with --resume.")
+    parser.add_argument("--engine", choices=ENGINES, default="indexed", help="TTC engine to use.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Solve independent student/course components in this many processes (indexed engine).")
+    parser.add_argument("--stats", default=None, help="Write per-phase timers and TTC counters to this JSON file.")
+    parser.add_argument("--save-snapshot", default=None,
+                        help="Save the allocation state to this .npz file so late registrations can be processed later.")
+    parser.add_argument("--resume", default=None,
+                        help="Snapshot from an earlier run. --registrations then holds only the late rows, "
+                             "which get the remaining seats; --seats is ignored.")
+    parser.add_argument("--trace", default=None,
+                        help="Write a compact audit trace of every TTC iteration to this .npz file (indexed engine, one worker).")
+    parser.add_argument("--certify", action="store_true",
+                        help="Check that the result has no improving trade cycle or free-seat improvement (indexed engine).")
+    add_event_args(parser)
+    add_cache_args(parser)
+    args = parser.parse_args()
+    if args.certify and args.engine == "legacy":
+        parser.error("--certify needs the indexed engine.")
+    if args.resume and args.output is None:
+        # A resume writes only the late rows, so it must not replace the main round's result by default
+        parser.error("--resume needs an explicit --output.")
+    seats_file = args.seats
+    registration_file = args.registrations
+    output_file = args.output or "data/output/Result.xlsx"
     
     print("--- Starting Course Allocation Process ---")
     
-    df_seats = load_dataframe(seats_file)
-    df_reg = load_dataframe(registration_file)
+    snapshot = AllocationSnapshot.load(args.resume) if args.resume else None
+    # Parsed courses and registrations of unchanged input files come from the cache
+    cache = cache_from_args(args)
+    courses_key, courses = cache.lookup(seats_file, "courses") if cache is not None and snapshot is None else (None, None)
+    registrations_key, registrations = cache.lookup(registration_file, "registrations") if cache is not None else (None, None)
+    if courses is not None or registrations is not None:
+        print("Using parsed input from the cache.")
 
-    if df_seats is None or df_reg is None:
+    df_seats = load_dataframe(seats_file, usecols=SEATS_USECOLS) if snapshot is None and courses is None else None
+    df_reg = load_dataframe(registration_file, usecols=REGISTRATION_USECOLS) if registrations is None else None
+
+    if (df_seats is None and snapshot is None and courses is None) or (df_reg is None and registrations is None):
         print("Could not load necessary files. Aborting.")
         return
 
     # Initialize and run the processor
-    processor = AddDropProcessor(courses_df=df_seats, registrations_df=df_reg)
-    result_df = processor.run()
-    
-    # Save the results
+    events = event_log_from_args(args)
+    trace = TraceRecorder() if args.trace else None
+    try:
+        processor = AddDropProcessor(courses_df=df_seats, registrations_df=df_reg, engine=args.engine, events=events,
+                                     collect_stats=args.stats is not None, workers=args.workers, snapshot=snapshot,
+                                     courses=courses, registrations=registrations, trace=trace)
+        parsed_courses, parsed_registrations = processor.parsed_input()
+        if courses_key is not None and courses is None:
+            cache.put(courses_key, parsed_courses)
+        if registrations_key is not None and registrations is None:
+            cache.put(registrations_key, parsed_registrations)
+        result_df = processor.run()
+    finally:
+        # Flush buffered event records even if the run fails
+        events.close()
+
+    # Save the results before the optional outputs, so a failure there cannot lose them
     save_dataframe(result_df, output_file)
+
+    if args.certify:
+        checker = OptimalityChecker.from_processor(processor)
+        checker.check()
+        checker.report()
+
+    if trace is not None:
+        trace.save(args.trace)
+        print(f"TTC trace of {trace.iterations} iterations saved to '{args.trace}'.")
+
+    if processor.stats is not None:
+        processor.stats.to_json(args.stats)
+        print(f"Run statistics saved to '{args.stats}'.")
+
+    if args.save_snapshot:
+        processor.snapshot().save(args.save_snapshot)
+        print(f"Allocation snapshot saved to '{args.save_snapshot}'.")
     
     print("\n--- Course Allocation Process Completed ---")
 
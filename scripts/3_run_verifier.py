@@ -1,33 +1,75 @@
+import argparse
 import sys
 import os
 
 # Adjust path to import from the src directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.utils.file_io import load_dataframe
-from src.verifier.verifier import ResultVerifier
+from src.utils.file_io import load_dataframe, save_dataframe
+from src.verifier.verifier import ResultVerifier, registration_table
+from src.verifier.optimality import OptimalityChecker
+from src.utils.helpers import REGISTRATION_USECOLS, SEATS_USECOLS
+from src.utils.cache import add_cache_args, cache_from_args
 
 def main():
     """
     Main function to verify the results of the allocation.
     """
-    registration_file = "data/input/RegistrationData.xlsx"
-    result_file = "data/output/Result.xlsx"
+    parser = argparse.ArgumentParser(description="Verify the add-drop results against the registrations.")
+    parser.add_argument("--registrations", default="data/input/RegistrationData.xlsx",
+                        help="Registration data (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--result", default="data/output/Result.xlsx",
+                        help="Allocation result (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--full", action="store_true",
+                        help="Check all invariants: request matching, duplicates and, with --seats, capacities.")
+    parser.add_argument("--seats", default=None,
+                        help="Elective seat file, for the capacity checks of --full.")
+    parser.add_argument("--violations", default=None,
+                        help="With --full, write the structured violations table to this file.")
+    parser.add_argument("--optimality", action="store_true",
+                        help="Also check for improving trade cycles and free-seat improvements; needs --seats.")
+    add_cache_args(parser)
+    args = parser.parse_args()
+    registration_file = args.registrations
+    result_file = args.result
     
     print("\n--- Starting Verification Process ---")
     
-    df_reg = load_dataframe(registration_file)
+    cache = cache_from_args(args)
+    # The normalized registration table of an unchanged file comes from the cache
+    table_key, table = cache.lookup(registration_file, "verifier_registrations") if cache is not None else (None, None)
+    if table is not None:
+        print("Using parsed registrations from the cache.")
+    # The optimality check rebuilds the occupants from the raw registration rows
+    needs_reg = table is None or (args.optimality and args.seats)
+    df_reg = load_dataframe(registration_file, usecols=REGISTRATION_USECOLS, cache=cache) if needs_reg else None
     df_result = load_dataframe(result_file)
+    df_seats = load_dataframe(args.seats, usecols=SEATS_USECOLS, cache=cache) if args.seats else None
 
-    if df_reg is None or df_result is None:
+    if (needs_reg and df_reg is None) or df_result is None or (args.seats and df_seats is None):
         print("Could not load necessary files for verification. Aborting.")
         return
-        
-    verifier = ResultVerifier(registration_df=df_reg, result_df=df_result)
+
+    if table is None:
+        table = registration_table(df_reg)
+        if table_key is not None:
+            cache.put(table_key, table)
+    verifier = ResultVerifier(registration_df=df_reg, result_df=df_result, seats_df=df_seats, registrations=table)
     
-    if verifier.verify():
+    if verifier.verify(full=args.full):
         print("\nVerification successful!")
+
+    if args.full and args.violations:
+        save_dataframe(verifier.violations, args.violations)
     
     verifier.report()
+
+    if args.optimality:
+        if df_seats is None:
+            print("\nThe optimality check needs the seat file (--seats). Skipping it.")
+        else:
+            checker = OptimalityChecker.from_result(df_seats, df_reg, df_result)
+            checker.check()
+            checker.report()
     print("\n--- Verification Process Completed ---")
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+import argparse
+import sys
+import os
+
+# Adjust path to import from the src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.benchmark.generator import WorkloadSpec, generate_workload
+from src.utils.file_io import save_dataframe
+
+def main():
+    """
+    Main function to write a synthetic seat file and registration sheet.
+    """
+    parser = argparse.ArgumentParser(description="Generate synthetic add-drop input files.")
+    parser.add_argument("--students", type=int, default=1000, help="Number of students.")
+    parser.add_argument("--courses", type=int, default=50, help="Number of courses.")
+    parser.add_argument("--tightness", type=float, default=2.0, help="Demand over free seats.")
+    parser.add_argument("--add-rate", type=float, default=0.6, help="Share of students submitting adds.")
+    parser.add_argument("--drop-rate", type=float, default=0.3, help="Chance each drop slot is used.")
+    parser.add_argument("--unconditional-rate", type=float, default=0.3, help="Share of drops without replacements.")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of course popularity.")
+    parser.add_argument("--departments", type=int, default=1, help="Number of departments splitting the courses.")
+    parser.add_argument("--cross-department-rate", type=float, default=0.01,
+                        help="Chance a preference or held course comes from another department.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seats-output", default="data/input/ElectiveSeats.xlsx")
+    parser.add_argument("--registrations-output", default="data/input/RegistrationData_Original.xlsx")
+    args = parser.parse_args()
+
+    print("--- Generating Synthetic Workload ---")
+
+    spec = WorkloadSpec(
+        n_students=args.students, n_courses=args.courses, tightness=args.tightness,
+        add_rate=args.add_rate, drop_rate=args.drop_rate, unconditional_rate=args.unconditional_rate,
+        popularity_skew=args.skew, n_departments=args.departments,
+        cross_department_rate=args.cross_department_rate, seed=args.seed,
+    )
+    courses_df, registrations_df = generate_workload(spec)
+    save_dataframe(courses_df, args.seats_output)
+    save_dataframe(registrations_df, args.registrations_output)
+
+    print("\n--- Workload Generation Completed ---")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import sys
+import os
+
+# Adjust path to import from the src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pandas as pd
+from src.allocator.trace import AuditTrace
+from src.utils.file_io import save_dataframe
+from src.utils.helpers import extract_course_code
+
+def main():
+    """
+    Main function to answer questions about a run from its TTC trace.
+    """
+    parser = argparse.ArgumentParser(description="Query a TTC audit trace written by 2_run_allocation.py --trace.")
+    parser.add_argument("trace", help="Trace file (.npz).")
+    parser.add_argument("--output", default=None, help="Also write the answer table to this file.")
+    queries = parser.add_subparsers(dest="query", required=True)
+    explain = queries.add_parser("explain", help="Show how each of a student's requests was allocated.")
+    explain.add_argument("student", help="Student ID.")
+    holders = queries.add_parser("holders", help="Show who held a course at the start of an iteration.")
+    holders.add_argument("course", help="Course code.")
+    holders.add_argument("--round", type=int, default=1,
+                         help="TTC iteration, from 1 to one past the last (the final state).")
+    args = parser.parse_args()
+
+    trace = AuditTrace.load(args.trace)
+    print(f"Trace of {trace.iterations} iterations, {len(trace.occ_original)} occupants.\n")
+    try:
+        if args.query == "explain":
+            answer = trace.explain_student(args.student)
+        else:
+            seats = trace.seat_summary(args.course, args.round)
+            print(f"{extract_course_code(args.course)} at the start of iteration {args.round}: "
+                  f"{seats['seats_held']} seats held, capacity {seats['capacity']}.")
+            answer = trace.course_holders(args.course, args.round)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    with pd.option_context("display.max_colwidth", None, "display.width", 200):
+        print(answer.to_string(index=False))
+    if args.output:
+        save_dataframe(answer, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import sys
+import os
+
+# Adjust path to import from the src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.allocator.processor import ENGINES
+from src.benchmark.suite import DEFAULT_SIZES, compare_results, run_assignment_cost, run_benchmark
+from src.utils.file_io import load_dataframe, save_dataframe
+
+def main():
+    """
+    Main function to benchmark the allocator on synthetic workloads.
+    """
+    parser = argparse.ArgumentParser(description="Time each allocation phase on synthetic workloads.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Workload sizes, in occupants.")
+    parser.add_argument("--engine", choices=ENGINES, default="indexed", help="TTC engine to use.")
+    parser.add_argument("--courses", type=int, default=200, help="Number of courses.")
+    parser.add_argument("--tightness", type=float, default=2.0, help="Demand over free seats.")
+    parser.add_argument("--add-rate", type=float, default=0.6, help="Share of students submitting adds.")
+    parser.add_argument("--drop-rate", type=float, default=0.3, help="Chance each drop slot is used.")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of course popularity.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory runs.")
+    parser.add_argument("--assignment-cost", action="store_true",
+                        help="Instead of the phases, time single legacy-engine assignments at each size.")
+    parser.add_argument("--output", default="data/output/benchmark.csv", help="Where to write the measurements.")
+    parser.add_argument("--compare", default=None, help="Earlier benchmark output to compare against.")
+    args = parser.parse_args()
+
+    print("--- Starting Allocation Benchmark ---")
+
+    spec_kwargs = dict(n_courses=args.courses, tightness=args.tightness, add_rate=args.add_rate,
+                       drop_rate=args.drop_rate, popularity_skew=args.skew, seed=args.seed)
+    if args.assignment_cost:
+        results = run_assignment_cost(sizes=args.sizes, **spec_kwargs)
+    else:
+        results = run_benchmark(sizes=args.sizes, engine=args.engine, measure_memory=not args.no_memory, **spec_kwargs)
+    print(results.to_string(index=False))
+    save_dataframe(results, args.output)
+
+    if args.compare and not args.assignment_cost:
+        baseline = load_dataframe(args.compare)
+        if baseline is not None:
+            print("\nComparison with baseline:")
+            print(compare_results(results, baseline).to_string(index=False))
+
+    print("\n--- Benchmark Completed ---")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import sys
+import os
+
+# Adjust path to import from the src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.file_io import load_dataframe, save_dataframe
+from src.allocator.lottery import run_lottery
+from src.utils.helpers import REGISTRATION_USECOLS, SEATS_USECOLS
+from src.utils.events import add_event_args, event_log_from_args
+
+def main():
+    """
+    Main function to estimate assignment probabilities over many randomized orderings.
+    """
+    parser = argparse.ArgumentParser(description="Run the allocation over many seeded shuffles of the registrations.")
+    parser.add_argument("--seats", default="data/input/ElectiveSeats.xlsx",
+                        help="Elective seat file (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--registrations", default="data/input/RegistrationData_Original.xlsx",
+                        help="Registration data (.xlsx, .csv, .parquet or .feather); its row order is ignored.")
+    parser.add_argument("--runs", type=int, default=100, help="Number of randomized orderings.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the orderings.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes.")
+    parser.add_argument("--output", default="data/output/LotteryStudents.xlsx",
+                        help="Where to write per-student result probabilities.")
+    parser.add_argument("--course-output", default="data/output/LotteryCourses.xlsx",
+                        help="Where to write per-course assignment statistics.")
+    add_event_args(parser)
+    args = parser.parse_args()
+
+    print("--- Starting Allocation Lottery ---")
+
+    df_seats = load_dataframe(args.seats, usecols=SEATS_USECOLS)
+    df_reg = load_dataframe(args.registrations, usecols=REGISTRATION_USECOLS)
+
+    if df_seats is None or df_reg is None:
+        print("Could not load necessary files. Aborting.")
+        return
+
+    events = event_log_from_args(args)
+    try:
+        student_report, course_report = run_lottery(df_seats, df_reg, runs=args.runs, seed=args.seed,
+                                                    workers=args.workers, events=events)
+    finally:
+        events.close()
+
+    save_dataframe(student_report, args.output)
+    save_dataframe(course_report, args.course_output)
+
+    print("\n--- Allocation Lottery Completed ---")
+
+if __name__ == "__main__":
+    main()
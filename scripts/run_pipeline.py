@@ -0,0 +1,104 @@
+import argparse
+import sys
+import os
+
+# Adjust path to import from the src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.file_io import load_dataframe, save_dataframe
+from src.allocator.processor import AddDropProcessor, ENGINES
+from src.pipeline.runner import run_pipeline
+from src.verifier.verifier import registration_table
+from src.utils.helpers import SEATS_USECOLS
+from src.utils.events import OFF, EventLog, add_event_args, event_log_from_args
+from src.utils.cache import add_cache_args, cache_from_args
+from src.utils.shuffle import save_shuffle_record
+
+def main():
+    """
+    Main function to randomize, allocate and verify in a single process.
+    """
+    parser = argparse.ArgumentParser(description="Run the randomizer, allocation and verifier in one process.")
+    parser.add_argument("--seats", default="data/input/ElectiveSeats.xlsx",
+                        help="Elective seat file (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--input", default="data/input/RegistrationData_Original.xlsx",
+                        help="Original registration data (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for a reproducible shuffle; a new one is drawn and recorded if omitted.")
+    parser.add_argument("--shuffled-output", default=None,
+                        help="Also write the shuffled registrations here, as 1_run_randomizer.py does.")
+    parser.add_argument("--output", default="data/output/Result.xlsx",
+                        help="Where to write the results; the format follows the extension.")
+    parser.add_argument("--engine", choices=ENGINES, default="indexed", help="TTC engine to use.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Solve independent student/course components in this many processes (indexed engine).")
+    parser.add_argument("--full", action="store_true", help="Verify all invariants, including capacities.")
+    parser.add_argument("--violations", default=None, help="With --full, write the violations table to this file.")
+    parser.add_argument("--certify", action="store_true",
+                        help="Check that the result has no improving trade cycle or free-seat improvement (indexed engine).")
+    parser.add_argument("--sync-writes", action="store_true",
+                        help="Write outputs before starting the next stage instead of in the background.")
+    parser.add_argument("--timings", default=None, help="Write the per-stage timings to this file.")
+    add_event_args(parser)
+    add_cache_args(parser)
+    args = parser.parse_args()
+    if args.certify and args.engine == "legacy":
+        parser.error("--certify needs the indexed engine.")
+
+    print("--- Starting Add-Drop Pipeline ---")
+
+    cache = cache_from_args(args)
+    df_seats = load_dataframe(args.seats, usecols=SEATS_USECOLS, cache=cache)
+    df_original = load_dataframe(args.input, cache=cache)
+
+    if df_seats is None or df_original is None or df_original.empty:
+        print("Could not load necessary files. Aborting.")
+        return
+
+    # The input parsed in its original order comes from the cache; the pipeline reorders it with the shuffle
+    registrations = table = None
+    if cache is not None:
+        registrations_key, registrations = cache.lookup(args.input, "registrations")
+        table_key, table = cache.lookup(args.input, "verifier_registrations")
+        if registrations is not None and table is not None:
+            print("Using parsed registrations from the cache.")
+        if registrations is None:
+            registrations = AddDropProcessor(df_seats, df_original, events=EventLog(console_level=OFF)).parsed_input()[1]
+            cache.put(registrations_key, registrations)
+        if table is None:
+            table = registration_table(df_original)
+            cache.put(table_key, table)
+
+    events = event_log_from_args(args)
+    try:
+        result = run_pipeline(df_seats, df_original, seed=args.seed, engine=args.engine, workers=args.workers,
+                              full=args.full, certify=args.certify, shuffled_output=args.shuffled_output,
+                              result_output=args.output, background_writes=not args.sync_writes, events=events,
+                              registrations=registrations, registration_table=table)
+    finally:
+        events.close()
+
+    # Record the seed next to each output, as 1_run_randomizer.py does
+    record = {"method": "in_memory", "seed": result.seed, "rows": len(df_original), "input": args.input}
+    for output_file in (args.output, args.shuffled_output):
+        if output_file:
+            save_shuffle_record(output_file, record)
+    print(f"\nShuffled with seed {result.seed}; recorded in the shuffle record next to the output.")
+
+    if result.verified:
+        print("\nVerification successful!")
+    if args.full and args.violations:
+        save_dataframe(result.verifier.violations, args.violations)
+    result.verifier.report()
+    if result.optimality is not None:
+        result.optimality.report()
+
+    timings = result.timings()
+    print("\nStage timings:")
+    print(timings.to_string(index=False))
+    if args.timings:
+        save_dataframe(timings, args.timings)
+
+    print("\n--- Add-Drop Pipeline Completed ---")
+
+if __name__ == "__main__":
+    main()
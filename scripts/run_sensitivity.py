@@ -0,0 +1,60 @@
+import argparse
+import sys
+import os
+
+# Adjust path to import from the src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.file_io import load_dataframe, save_dataframe
+from src.allocator.sensitivity import per_course_scenarios, run_sensitivity, scenarios_from_table
+from src.utils.helpers import REGISTRATION_USECOLS, SEATS_USECOLS
+from src.utils.events import add_event_args, event_log_from_args
+
+def main():
+    """
+    Main function to compare allocations under different seat capacities.
+    """
+    parser = argparse.ArgumentParser(description="Run the allocation under several capacity-change scenarios.")
+    parser.add_argument("--seats", default="data/input/ElectiveSeats.xlsx",
+                        help="Elective seat file (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--registrations", default="data/input/RegistrationData.xlsx",
+                        help="Registration data (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--scenarios", default=None,
+                        help="Table of scenarios: scenario name, course code and change in seats on each row. "
+                             "The header row is optional.")
+    parser.add_argument("--each-course", type=int, default=None,
+                        help="Also run one scenario per course, adding this many seats to it.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes.")
+    parser.add_argument("--output", default="data/output/Sensitivity.xlsx",
+                        help="Where to write the scenario comparison.")
+    add_event_args(parser)
+    args = parser.parse_args()
+
+    print("--- Starting Capacity Sensitivity Analysis ---")
+
+    df_seats = load_dataframe(args.seats, usecols=SEATS_USECOLS)
+    df_reg = load_dataframe(args.registrations, usecols=REGISTRATION_USECOLS)
+    df_scenarios = load_dataframe(args.scenarios) if args.scenarios else None
+
+    if df_seats is None or df_reg is None or (args.scenarios and df_scenarios is None):
+        print("Could not load necessary files. Aborting.")
+        return
+
+    events = event_log_from_args(args)
+    try:
+        scenarios = scenarios_from_table(df_scenarios) if df_scenarios is not None else {}
+        if args.each_course is not None:
+            scenarios.update(per_course_scenarios(df_seats, args.each_course))
+        report = run_sensitivity(df_seats, df_reg, scenarios, workers=args.workers, events=events)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    finally:
+        events.close()
+
+    print(report.to_string(index=False))
+    save_dataframe(report, args.output)
+
+    print("\n--- Capacity Sensitivity Analysis Completed ---")
+
+if __name__ == "__main__":
+    main()
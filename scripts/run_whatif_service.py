@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import signal
+import sys
+import os
+
+# Adjust path to import from the src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.file_io import load_dataframe
+from src.allocator.processor import AddDropProcessor
+from src.allocator.snapshot import AllocationSnapshot
+from src.service.server import QueryServer
+from src.service.whatif import WhatIfState
+from src.utils.helpers import REGISTRATION_USECOLS, SEATS_USECOLS
+from src.utils.events import add_event_args, event_log_from_args
+
+def _stop(signum, frame):
+    """Stops the service on SIGTERM the same way as on Ctrl+C, so shutdown steps still run."""
+    raise KeyboardInterrupt
+
+def main():
+    """
+    Main function to serve what-if queries against the seats left by an allocation.
+    """
+    parser = argparse.ArgumentParser(description="Serve what-if queries and late registrations over localhost HTTP.")
+    parser.add_argument("--seats", default="data/input/ElectiveSeats.xlsx",
+                        help="Elective seat file (.xlsx, .csv, .parquet or .feather).")
+    parser.add_argument("--registrations", default="data/input/RegistrationData.xlsx",
+                        help="Registration data (.xlsx, .csv, .parquet or .feather) allocated at startup.")
+    parser.add_argument("--resume", default=None,
+                        help="Start from this snapshot instead of allocating --seats and --registrations.")
+    parser.add_argument("--save-snapshot", default=None,
+                        help="Save the seat state with the committed registrations to this .npz file after every "
+                             "commit and on shutdown, for a later --resume round.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    add_event_args(parser)
+    args = parser.parse_args()
+
+    print("--- Starting What-If Service ---")
+
+    events = event_log_from_args(args)
+    try:
+        if args.resume:
+            snapshot = AllocationSnapshot.load(args.resume)
+        else:
+            df_seats = load_dataframe(args.seats, usecols=SEATS_USECOLS)
+            df_reg = load_dataframe(args.registrations, usecols=REGISTRATION_USECOLS)
+            if df_seats is None or df_reg is None:
+                print("Could not load necessary files. Aborting.")
+                return
+            processor = AddDropProcessor(courses_df=df_seats, registrations_df=df_reg, events=events)
+            processor.run()
+            snapshot = processor.snapshot()
+
+        state = WhatIfState(snapshot, events=events, snapshot_path=args.save_snapshot)
+        server = QueryServer(state, events=events)
+        signal.signal(signal.SIGTERM, _stop)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if args.save_snapshot:
+                state.save_snapshot()
+                print(f"\nAllocation snapshot saved to '{args.save_snapshot}'.")
+    finally:
+        events.close()
+
+    print("\n--- What-If Service Stopped ---")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+from .models import Course, Registration, DUMMY_COURSE_CODE
+
+# Stand-in for the dummy course's infinite capacity in integer arrays.
+UNLIMITED_CAPACITY = np.iinfo(np.int64).max
+
+# Marks an occupant whose final course has not been assigned yet.
+UNASSIGNED = -1
+
+def csr_positions(offsets: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Flat positions of the given CSR rows' entries, concatenated in the order of `rows`."""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    return np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+
+@dataclass
+class CompiledInstance:
+    """
+    Integer-interned, array-backed form of the TTC problem.
+
+    Course codes and student IDs are interned to dense ints. Course indices below
+    `n_known` are courses from the seat file (including the dummy course); higher
+    indices are original courses that only appear in drop requests. Occupant i's
+    preferences are `pref_courses[pref_offsets[i]:pref_offsets[i + 1]]`, with codes
+    that are not in the seat file left out since TTC can never point at them.
+    """
+    course_codes: List[str]
+    n_known: int
+    dummy: int
+    capacity: np.ndarray
+    seats_held: np.ndarray
+    student_ids: List[str]
+    occ_student: np.ndarray
+    occ_original: np.ndarray
+    final_course: np.ndarray
+    pref_offsets: np.ndarray
+    pref_courses: np.ndarray
+
+    @property
+    def n_courses(self) -> int:
+        return len(self.course_codes)
+
+    @property
+    def n_occupants(self) -> int:
+        return len(self.occ_original)
+
+    @classmethod
+    def build(cls, courses: Dict[str, Course], registrations: List[Registration]) -> "CompiledInstance":
+        """
+        Creates occupants for all add requests and conditional drops, in the same order
+        AddDropProcessor creates Occupant objects, and sets the initial seats held.
+        """
+        course_codes = list(courses)
+        course_index = {code: i for i, code in enumerate(course_codes)}
+        n_known = len(course_codes)
+        dummy = course_index[DUMMY_COURSE_CODE]
+
+        student_ids: List[str] = []
+        student_index: Dict[str, int] = {}
+        occ_student: List[int] = []
+        occ_original: List[int] = []
+        pref_offsets: List[int] = [0]
+        pref_courses: List[int] = []
+
+        def known(codes: Sequence[str]) -> List[int]:
+            return [course_index[c] for c in codes if c in courses]
+
+        def add_occupant(student: int, original: int, prefs: List[int]):
+            occ_student.append(student)
+            occ_original.append(original)
+            pref_courses.extend(prefs)
+            pref_offsets.append(len(pref_courses))
+
+        for reg in registrations:
+            student = student_index.get(reg.student_id)
+            if student is None:
+                student = student_index[reg.student_id] = len(student_ids)
+                student_ids.append(reg.student_id)
+
+            if reg.add_requests > 0:
+                add_prefs = known(reg.add_preferences) + [dummy] # Fallback is to get no course
+                for _ in range(reg.add_requests):
+                    add_occupant(student, dummy, add_prefs)
+
+            for drop_code, repl_prefs in reg.get_conditional_drops():
+                original = course_index.get(drop_code)
+                if original is None:
+                    original = course_index[drop_code] = len(course_codes)
+                    course_codes.append(drop_code)
+                # Fallback is to keep the original course
+                add_occupant(student, original, known((*repl_prefs, drop_code)))
+
+        n_courses = len(course_codes)
+        capacity = np.zeros(n_courses, dtype=np.int64)
+        seats_held = np.zeros(n_courses, dtype=np.int64)
+        for code, course in courses.items():
+            i = course_index[code]
+            capacity[i] = UNLIMITED_CAPACITY if course.capacity == float('inf') else int(course.capacity)
+            seats_held[i] = course.seats_held
+
+        occ_original_arr = np.asarray(occ_original, dtype=np.int32)
+        seats_held += np.bincount(occ_original_arr, minlength=n_courses)
+
+        return cls(
+            course_codes=course_codes,
+            n_known=n_known,
+            dummy=dummy,
+            capacity=capacity,
+            seats_held=seats_held,
+            student_ids=student_ids,
+            occ_student=np.asarray(occ_student, dtype=np.int32),
+            occ_original=occ_original_arr,
+            final_course=np.full(len(occ_original), UNASSIGNED, dtype=np.int32),
+            pref_offsets=np.asarray(pref_offsets, dtype=np.int64),
+            pref_courses=np.asarray(pref_courses, dtype=np.int32),
+        )
+
+    def subset(self, occupants: np.ndarray) -> "CompiledInstance":
+        """
+        Returns an instance holding only the given occupants, renumbered from 0 in the order
+        given; passing a permutation of all occupants reorders them. Courses keep their indices;
+        seat counts only include the selected occupants' original courses. Call before running TTC.
+        """
+        student_index, occ_student = np.unique(self.occ_student[occupants], return_inverse=True)
+        pref_offsets = np.zeros(len(occupants) + 1, dtype=np.int64)
+        np.cumsum(np.diff(self.pref_offsets)[occupants], out=pref_offsets[1:])
+        positions = csr_positions(self.pref_offsets, occupants)
+
+        occ_original = self.occ_original[occupants]
+        seats_held = (self.seats_held - np.bincount(self.occ_original, minlength=self.n_courses)
+                      + np.bincount(occ_original, minlength=self.n_courses))
+
+        return CompiledInstance(
+            course_codes=self.course_codes,
+            n_known=self.n_known,
+            dummy=self.dummy,
+            capacity=self.capacity,
+            seats_held=seats_held,
+            student_ids=[self.student_ids[i] for i in student_index.tolist()],
+            occ_student=occ_student.astype(np.int32),
+            occ_original=occ_original,
+            final_course=self.final_course[occupants],
+            pref_offsets=pref_offsets,
+            pref_courses=self.pref_courses[positions],
+        )
+
+    def write_back(self, courses: Dict[str, Course]):
+        """Copies the seats held for every known course back onto the Course objects."""
+        for i in range(self.n_known):
+            courses[self.course_codes[i]].seats_held = int(self.seats_held[i])
+
+    def changed_rows(self) -> List[List[str]]:
+        """
+        Returns [student_id, dropped_course, replacement_course] rows for successful adds
+        and swaps, in occupant order. This is the only place codes are translated back.
+        """
+        final = np.where(self.final_course == UNASSIGNED, self.occ_original, self.final_course)
+        is_add = self.occ_original == self.dummy
+        changed = np.where(is_add, final != self.dummy, final != self.occ_original)
+
+        codes = np.asarray(self.course_codes, dtype=object)
+        students = np.asarray(self.student_ids, dtype=object)[self.occ_student[changed]]
+        dropped = np.where(is_add[changed], "", codes[self.occ_original[changed]])
+        replacement = codes[final[changed]]
+        return [list(row) for row in zip(students, dropped, replacement)]
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from .compiled import CompiledInstance, UNASSIGNED, csr_positions
+from .models import Registration
+from .processor import AddDropProcessor
+from .ttc import IndexedTTC
+from src.utils.events import EventLog, OFF
+
+def registration_offsets(registrations: List[Registration]) -> np.ndarray:
+    """
+    Occupant ranges of each registration: registration r creates occupants
+    offsets[r]:offsets[r + 1], matching the order CompiledInstance.build uses.
+    """
+    counts = [max(reg.add_requests, 0) + len(reg.get_conditional_drops()) for reg in registrations]
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+def shuffled_occupants(offsets: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Occupant IDs in the order they would be created from a shuffled registration sheet.
+    Shuffling rows only changes occupant order, so this stands in for re-parsing the sheet.
+    """
+    order = rng.permutation(len(offsets) - 1)
+    return csr_positions(offsets, order)
+
+@dataclass
+class LotteryTally:
+    """Outcome counts summed over a batch of randomized orderings."""
+    runs: int
+    # Per preference entry: runs in which its occupant was moved to that course
+    slot_counts: np.ndarray
+    # Per course: occupants moved into it, summed, and its fewest and most in one run
+    course_gains: np.ndarray
+    course_min_gains: np.ndarray
+    course_max_gains: np.ndarray
+    # Per course: runs in which it ended with no free seat
+    course_full: np.ndarray
+
+    @classmethod
+    def empty(cls, instance: CompiledInstance) -> "LotteryTally":
+        n = instance.n_courses
+        return cls(
+            runs=0,
+            slot_counts=np.zeros(len(instance.pref_courses), dtype=np.int64),
+            course_gains=np.zeros(n, dtype=np.int64),
+            course_min_gains=np.full(n, np.iinfo(np.int64).max, dtype=np.int64),
+            course_max_gains=np.zeros(n, dtype=np.int64),
+            course_full=np.zeros(n, dtype=np.int64),
+        )
+
+    def add_run(self, instance: CompiledInstance, final_course: np.ndarray, seats_held: np.ndarray):
+        """Counts one run's outcome, given final courses in the instance's occupant order."""
+        changed = np.flatnonzero((final_course != UNASSIGNED) & (final_course != instance.occ_original))
+        gains = np.bincount(final_course[changed], minlength=instance.n_courses)
+
+        # Occupants of one student that made the same move give one result row; count it once
+        n = instance.n_courses
+        rows = (instance.occ_student[changed].astype(np.int64) * n + instance.occ_original[changed]) * n + final_course[changed]
+        changed = changed[np.sort(np.unique(rows, return_index=True)[1])]
+        # A moved occupant's new course is one of its preferences; count it at its first entry
+        positions = csr_positions(instance.pref_offsets, changed)
+        owner = np.repeat(np.arange(len(changed)), np.diff(instance.pref_offsets)[changed])
+        hits = np.flatnonzero(instance.pref_courses[positions] == final_course[changed][owner])
+        _, first = np.unique(owner[hits], return_index=True)
+        self.slot_counts += np.bincount(positions[hits[first]], minlength=len(self.slot_counts))
+
+        self.course_gains += gains
+        np.minimum(self.course_min_gains, gains, out=self.course_min_gains)
+        np.maximum(self.course_max_gains, gains, out=self.course_max_gains)
+        self.course_full += seats_held >= instance.capacity
+        self.runs += 1
+
+    def merge(self, other: "LotteryTally"):
+        self.runs += other.runs
+        self.slot_counts += other.slot_counts
+        self.course_gains += other.course_gains
+        np.minimum(self.course_min_gains, other.course_min_gains, out=self.course_min_gains)
+        np.maximum(self.course_max_gains, other.course_max_gains, out=self.course_max_gains)
+        self.course_full += other.course_full
+
+def _run_orderings(instance: CompiledInstance, offsets: np.ndarray,
+                   seeds: List[np.random.SeedSequence]) -> LotteryTally:
+    """Runs TTC once per seed on a freshly shuffled occupant order and tallies the outcomes."""
+    tally = LotteryTally.empty(instance)
+    final_course = np.empty(instance.n_occupants, dtype=np.int32)
+    for seed in seeds:
+        occupants = shuffled_occupants(offsets, np.random.default_rng(seed))
+        shuffled = instance.subset(occupants)
+        IndexedTTC(shuffled, EventLog(console_level=OFF)).run()
+        final_course[occupants] = shuffled.final_course
+        tally.add_run(instance, final_course, shuffled.seats_held)
+    return tally
+
+def run_lottery(courses_df: pd.DataFrame, registrations_df: pd.DataFrame, runs: int, seed: int = 0,
+                workers: int = 1, events: EventLog | None = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Parses the inputs once and runs the allocation over `runs` random orderings of the
+    registrations, as if the randomizer had shuffled the sheet before each run. Ordering
+    i is shuffled with the i-th child of SeedSequence(seed), so results do not depend on
+    the number of workers.
+
+    Returns a per-student table with the share of runs in which each result row
+    (Student ID, Dropped Course, Replacement Course) occurred, and a per-course table
+    of assignments into each course and how often it ended full.
+    """
+    if runs < 1:
+        raise ValueError("The lottery needs at least one run.")
+    events = events if events is not None else EventLog()
+    processor = AddDropProcessor(courses_df, registrations_df, events=events)
+    offsets = registration_offsets(processor.parsed_input()[1])
+    instance = processor.compile()
+
+    seeds = np.random.SeedSequence(seed).spawn(runs)
+    batches = [batch.tolist() for batch in np.array_split(np.asarray(seeds, dtype=object), max(1, workers)) if len(batch)]
+    events.info("lottery_started", "Running {runs} randomized orderings on {workers} workers.",
+                runs=runs, workers=len(batches))
+
+    tally = LotteryTally.empty(instance)
+    if len(batches) <= 1:
+        tally.merge(_run_orderings(instance, offsets, seeds))
+    else:
+        with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+            for part in pool.map(_run_orderings, [instance] * len(batches), [offsets] * len(batches), batches):
+                tally.merge(part)
+
+    return _student_report(processor, instance, tally), _course_report(instance, tally)
+
+def _student_report(processor: AddDropProcessor, instance: CompiledInstance, tally: LotteryTally) -> pd.DataFrame:
+    """Probability of every result row; unconditional drops happen in every run."""
+    slots = np.flatnonzero(tally.slot_counts)
+    occupants = np.searchsorted(instance.pref_offsets, slots, side="right") - 1
+    codes = np.asarray(instance.course_codes, dtype=object)
+    original = instance.occ_original[occupants]
+
+    moves = pd.DataFrame({
+        "Student ID": np.asarray(instance.student_ids, dtype=object)[instance.occ_student[occupants]],
+        "Dropped Course": np.where(original == instance.dummy, "", codes[original]),
+        "Replacement Course": codes[instance.pref_courses[slots]],
+        "Probability": tally.slot_counts[slots] / tally.runs,
+    })
+    drops = pd.DataFrame(processor.unconditional_drops, columns=["Student ID", "Dropped Course"]).drop_duplicates()
+    drops["Replacement Course"] = ""
+    drops["Probability"] = 1.0
+
+    report = pd.concat([drops, moves], ignore_index=True)
+    return report.groupby(["Student ID", "Dropped Course", "Replacement Course"], sort=False, as_index=False)["Probability"].sum()
+
+def _course_report(instance: CompiledInstance, tally: LotteryTally) -> pd.DataFrame:
+    """Assignments into each seat-file course per run and how often it ended full."""
+    courses = np.asarray([i for i in range(instance.n_known) if i != instance.dummy], dtype=np.int64)
+    return pd.DataFrame({
+        "Course Code": [instance.course_codes[i] for i in courses.tolist()],
+        "Capacity": instance.capacity[courses],
+        "Mean Assigned": tally.course_gains[courses] / tally.runs,
+        "Min Assigned": tally.course_min_gains[courses],
+        "Max Assigned": tally.course_max_gains[courses],
+        "Full Probability": tally.course_full[courses] / tally.runs,
+    })
@@ -1,11 +1,11 @@
-from dataclasses import dataclass, field
-from typing import List, Dict
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
 
 # A special constant to represent a student who is not currently holding a real course
 # (i.e., they are making a pure 'add' request).
 DUMMY_COURSE_CODE = "XX111"
 
-@dataclass
+@dataclass(slots=True)
 class Course:
     """Represents an elective course with a seat capacity."""
     code: str
@@ -15,28 +15,48 @@ class Course:
     def has_free_seat(self) -> bool:
         return self.seats_held < self.capacity
 
-@dataclass
+@dataclass(slots=True)
 class Occupant:
-    """Represents a request (an agent) in the TTC algorithm."""
+    """
+    Represents a request (an agent) in the TTC algorithm.
+
+    `preferences` is an immutable tuple that occupants created from the same request share;
+    pruned entries are recorded as bits of `pruned` instead of being removed from it.
+    """
     occupant_id: int
     student_id: str
     original_course: str  # The course they currently hold (or DUMMY_COURSE_CODE)
-    preferences: List[str]
-    final_course: str = None
+    preferences: Tuple[str, ...]
+    final_course: str | None = None
+    pruned: int = 0  # Bit i is set once preferences[i] has been pruned
+
+    def remaining_preferences(self) -> Sequence[str]:
+        """The preferences that have not been pruned, in order."""
+        if not self.pruned:
+            return self.preferences
+        return [code for i, code in enumerate(self.preferences) if not self.pruned >> i & 1]
+
+    def prune(self, course_code: str) -> bool:
+        """Prunes the first remaining entry for the course, returning whether there was one."""
+        for i, code in enumerate(self.preferences):
+            if code == course_code and not self.pruned >> i & 1:
+                self.pruned |= 1 << i
+                return True
+        return False
 
-@dataclass
+@dataclass(slots=True)
 class Registration:
     """Represents a single student's full add/drop request from one row."""
     student_id: str
     add_requests: int
-    add_preferences: List[str]
-    # Each tuple is (course_to_drop, [replacement_prefs])
-    drop_requests: List[tuple[str, List[str]]]
+    add_preferences: Tuple[str, ...]
+    # Each tuple is (course_to_drop, (replacement_prefs))
+    drop_requests: Tuple[Tuple[str, Tuple[str, ...]], ...]
 
     def get_unconditional_drops(self) -> List[str]:
         """Returns drops that have no replacement preferences."""
         return [drop_code for drop_code, repls in self.drop_requests if not repls]
 
-    def get_conditional_drops(self) -> List[tuple[str, List[str]]]:
+    def get_conditional_drops(self) -> List[Tuple[str, Tuple[str, ...]]]:
         """Returns drops that have replacement preferences."""
         return [item for item in self.drop_requests if item[1]]
\ No newline at end of file
@@ -0,0 +1,94 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from .compiled import CompiledInstance
+from .stats import RunStats
+from .ttc import IndexedTTC
+from src.utils.events import EventLog, OFF
+
+
+def find_components(instance: CompiledInstance) -> np.ndarray:
+    """
+    Labels every occupant with its connected component.
+
+    Students and courses are linked by each occupant's original course and preferences,
+    and all occupants of a student share that student's component since assignments
+    prune across them. The dummy course is left out: it always has a free seat, so it
+    never makes occupants interact. Students with no real course get label -1.
+    """
+    n_students = len(instance.student_ids)
+    counts = np.diff(instance.pref_offsets)
+    entry_student = np.concatenate([np.repeat(instance.occ_student, counts), instance.occ_student])
+    entry_course = np.concatenate([instance.pref_courses, instance.occ_original])
+    real = entry_course != instance.dummy
+    entry_student, entry_course = entry_student[real], entry_course[real]
+
+    # Link every course of a student to that student's lowest course; the remaining
+    # course-to-course pairs are few enough for a plain union-find.
+    first_course = np.full(n_students, instance.n_courses, dtype=np.int64)
+    np.minimum.at(first_course, entry_student, entry_course)
+    n_courses = instance.n_courses
+    pairs = np.unique(entry_course.astype(np.int64) * n_courses + first_course[entry_student])
+
+    parent = list(range(n_courses))
+
+    def find(c: int) -> int:
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    for pair in pairs.tolist():
+        ra, rb = find(pair // n_courses), find(pair % n_courses)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    course_root = np.asarray([find(c) for c in range(n_courses)] + [-1], dtype=np.int64)
+    return course_root[first_course][instance.occ_student]
+
+def partition_occupants(labels: np.ndarray, n_parts: int) -> List[np.ndarray]:
+    """
+    Packs whole components into at most n_parts groups of similar occupant counts,
+    largest components first. Returns each group's occupant IDs in ascending order.
+    """
+    components, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    loads = [0] * min(n_parts, len(components))
+    part_of_component = np.zeros(len(components), dtype=np.int64)
+    for component in np.argsort(-sizes, kind="stable").tolist():
+        part = loads.index(min(loads))
+        part_of_component[component] = part
+        loads[part] += int(sizes[component])
+
+    occupant_part = part_of_component[inverse]
+    return [np.flatnonzero(occupant_part == part) for part in range(len(loads))]
+
+def _solve_part(instance: CompiledInstance, collect_stats: bool) -> Tuple[np.ndarray, np.ndarray, RunStats | None]:
+    """Runs TTC on one partition and returns final courses, seat changes and stats."""
+    initial_seats = instance.seats_held.copy()
+    stats = RunStats(engine="indexed") if collect_stats else None
+    IndexedTTC(instance, EventLog(console_level=OFF), stats).run()
+    return instance.final_course, instance.seats_held - initial_seats, stats
+
+def run_parallel(instance: CompiledInstance, workers: int, events: EventLog, stats: RunStats | None = None):
+    """
+    Solves the instance component by component in a process pool and merges the final
+    courses and seat counts back into it. The result matches a single IndexedTTC run,
+    since occupants in different components never point at each other or prune each
+    other's preferences. Per-assignment events are not emitted from worker processes.
+    """
+    parts = partition_occupants(find_components(instance), workers)
+    events.info("parallel_partitions", "Solving {parts} partitions of {sizes} occupants on {workers} workers.",
+                parts=len(parts), sizes=[len(p) for p in parts], workers=workers)
+    if len(parts) <= 1:
+        IndexedTTC(instance, events, stats).run()
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_solve_part, instance.subset(occupants), stats is not None) for occupants in parts]
+        for occupants, future in zip(parts, futures):
+            final_course, seat_changes, part_stats = future.result()
+            instance.final_course[occupants] = final_course
+            instance.seats_held += seat_changes
+            if stats is not None:
+                stats.merge_partition(part_stats)
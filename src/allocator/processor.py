@@ -1,72 +1,137 @@
+import numpy as np
 import pandas as pd
+from contextlib import nullcontext
+from dataclasses import replace
 from typing import List, Dict, Set, Tuple
 
 from .models import Course, Occupant, Registration, DUMMY_COURSE_CODE
-from src.utils.helpers import extract_course_code, is_no_course
+from .compiled import CompiledInstance, UNASSIGNED
+from .parallel import run_parallel
+from .snapshot import AllocationSnapshot
+from .stats import RunStats
+from .trace import TraceRecorder
+from .ttc import IndexedTTC
+from src.utils.events import DEBUG, EventLog
+from src.utils.helpers import (
+    ADD_COLUMNS, DROP_COLUMNS, REPL_COLUMNS, extract_course_codes, normalize_registrations
+)
+
+# Available TTC engines. 'indexed' is the incremental engine over a CompiledInstance,
+# 'legacy' rebuilds every Occupant's edge on each iteration and is kept for comparison.
+ENGINES = ("indexed", "legacy")
 
 class AddDropProcessor:
     """
     Manages the entire course allocation process using a Top Trading Cycles (TTC) algorithm.
+
+    Given a `snapshot` from an earlier run, courses_df is ignored and the registrations are
+    treated as late rows: they compete only for the seats left by that run, whose
+    allocations stay fixed.
+
+    Courses or registrations parsed earlier, as returned by parsed_input(), can be passed
+    as `courses` and `registrations`; the matching data frame is then not parsed.
+
+    With a `trace`, run() records each TTC iteration's edges and assignments into it.
     """
-    def __init__(self, courses_df: pd.DataFrame, registrations_df: pd.DataFrame):
-        self._courses: Dict[str, Course] = self._load_courses(courses_df)
-        self._registrations: List[Registration] = self._parse_registrations(registrations_df)
+    def __init__(self, courses_df: pd.DataFrame | None, registrations_df: pd.DataFrame | None, engine: str = "indexed",
+                 events: EventLog | None = None, collect_stats: bool = False, workers: int = 1,
+                 snapshot: AllocationSnapshot | None = None, courses: Dict[str, Course] | None = None,
+                 registrations: List[Registration] | None = None, trace: TraceRecorder | None = None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown TTC engine '{engine}'. Expected one of {ENGINES}.")
+        if workers > 1 and engine == "legacy":
+            raise ValueError("Parallel allocation (workers > 1) requires the 'indexed' engine.")
+        if trace is not None and (engine == "legacy" or workers > 1):
+            raise ValueError("Tracing requires the 'indexed' engine in a single process.")
+        self._trace = trace
+        self._engine = engine
+        # With more than one worker, independent components are solved in a process pool
+        self._workers = workers
+        self._events = events if events is not None else EventLog()
+        # Filled in by run() when collect_stats is set, otherwise left as None
+        self.stats: RunStats | None = RunStats(engine=engine) if collect_stats else None
+        self._previous = snapshot
+        with self._phase("parse"):
+            if snapshot is not None:
+                self._courses: Dict[str, Course] = self._resume_courses(snapshot)
+            elif courses is not None:
+                self._courses = {code: replace(course) for code, course in courses.items()}
+            else:
+                self._courses = self._load_courses(courses_df)
+            self._registrations: List[Registration] = (
+                registrations if registrations is not None else self._parse_registrations(registrations_df)
+            )
         self._occupants: List[Occupant] = []
+        # Legacy engine: student ID -> IDs of that student's active occupants
+        self._student_occupants: Dict[str, Set[int]] = {}
+        self._compiled: CompiledInstance | None = None
         self._unconditional_drops: List[Tuple[str, str]] = []
         self._occupant_id_counter = 0
 
+    def parsed_input(self) -> Tuple[Dict[str, Course], List[Registration]]:
+        """Copies of the parsed courses and the registrations, for reuse by another processor. Call before run()."""
+        return {code: replace(course) for code, course in self._courses.items()}, self._registrations
+
+    @property
+    def compiled(self) -> CompiledInstance | None:
+        """The compiled instance after compile() or run() with the indexed engine, otherwise None."""
+        return self._compiled
+
+    @property
+    def unconditional_drops(self) -> List[Tuple[str, str]]:
+        """(student ID, course) of every unconditional drop applied so far."""
+        return list(self._unconditional_drops)
+
+    def _phase(self, name: str):
+        """Times the enclosed block as a run phase when stats are collected."""
+        return self.stats.time_phase(name) if self.stats is not None else nullcontext()
+
     def _load_courses(self, df: pd.DataFrame) -> Dict[str, Course]:
         """Loads course data from a DataFrame into a dictionary of Course objects."""
+        codes = extract_course_codes(df.iloc[:, [0]]).iloc[:, 0]
+        seats = pd.to_numeric(df.iloc[:, 1], errors='coerce')
+        for code in codes[~np.isfinite(seats)]:
+            self._events.warning("invalid_seats", "Warning: Invalid seat number for course '{course}'. Defaulting to 0.", course=code)
+        seats = seats.where(np.isfinite(seats), 0).astype(np.int64)
+
         courses = {}
-        for _, row in df.iterrows():
-            code = extract_course_code(row.iloc[0])
-            try:
-                seats = int(row.iloc[1])
-            except (ValueError, TypeError):
-                print(f"Warning: Invalid seat number for course '{code}'. Defaulting to 0.")
-                seats = 0
+        for code, capacity in zip(codes.tolist(), seats.tolist()):
             if code != 'N/A':
-                courses[code] = Course(code=code, capacity=seats)
+                courses[code] = Course(code=code, capacity=capacity)
         
         # Add a dummy course with infinite capacity for handling pure 'add' requests.
         courses[DUMMY_COURSE_CODE] = Course(code=DUMMY_COURSE_CODE, capacity=float('inf'))
-        print(f"\nLoaded {len(courses)-1} courses.")
+        self._events.info("courses_loaded", "\nLoaded {count} courses.", count=len(courses) - 1)
         return courses
 
+    def _resume_courses(self, snapshot: AllocationSnapshot) -> Dict[str, Course]:
+        """Takes the courses, with their remaining seats, from an earlier run's snapshot."""
+        self._events.info("snapshot_loaded", "\nResuming from a snapshot of {courses} courses and {occupants} allocated occupants.",
+                          courses=snapshot.n_known - 1, occupants=snapshot.n_occupants)
+        return snapshot.courses()
+
     def _parse_registrations(self, df: pd.DataFrame) -> List[Registration]:
         """Parses the registration DataFrame into a list of Registration objects."""
-        registrations = []
-        for _, row in df.iterrows():
-            student_id = str(row.iloc[2])
-            
-            # Add requests
-            try:
-                num_adds = int(row.iloc[5])
-            except (ValueError, TypeError):
-                num_adds = 0
-            add_prefs = [extract_course_code(row.iloc[c]) for c in range(6, 10)]
-            add_prefs = [c for c in add_prefs if not is_no_course(c)]
-
-            # Drop requests
-            drop_requests = []
-            for i in range(3): # Loop for Drop #1, Drop #2, Drop #3
-                drop_col_start = 10 + (i * 4)
-                drop_course = extract_course_code(row.iloc[drop_col_start])
-                if not is_no_course(drop_course):
-                    repl_prefs = [extract_course_code(row.iloc[c]) for c in range(drop_col_start + 1, drop_col_start + 4)]
-                    repl_prefs = [c for c in repl_prefs if not is_no_course(c)]
-                    drop_requests.append((drop_course, repl_prefs))
-
-            registrations.append(Registration(
+        table = normalize_registrations(df)
+        add_prefs = [tuple(c for c in row if c) for row in table[ADD_COLUMNS].to_numpy().tolist()]
+        drop_slots = [
+            [(drop, tuple(c for c in repls if c)) if drop else None for drop, *repls in table[[drop_col] + repl_cols].to_numpy().tolist()]
+            for drop_col, repl_cols in zip(DROP_COLUMNS, REPL_COLUMNS)
+        ]
+
+        registrations = [
+            Registration(
                 student_id=student_id,
                 add_requests=num_adds,
-                add_preferences=add_prefs,
-                drop_requests=drop_requests
-            ))
-        print(f"Parsed {len(registrations)} registration entries.")
+                add_preferences=prefs,
+                drop_requests=tuple(req for req in slots if req is not None)
+            )
+            for student_id, num_adds, prefs, *slots in zip(table["student_id"], table["add_requests"].tolist(), add_prefs, *drop_slots)
+        ]
+        self._events.info("registrations_parsed", "Parsed {count} registration entries.", count=len(registrations))
         return registrations
 
-    def _create_occupant(self, student_id: str, original_course: str, preferences: List[str]) -> Occupant:
+    def _create_occupant(self, student_id: str, original_course: str, preferences: Tuple[str, ...]) -> Occupant:
         """Factory method for creating a new Occupant and incrementing the ID."""
         occ = Occupant(self._occupant_id_counter, student_id, original_course, preferences)
         self._occupant_id_counter += 1
@@ -80,34 +145,41 @@ class AddDropProcessor:
                 if dropped_course in self._courses:
                     self._courses[dropped_course].capacity += 1
                     self._unconditional_drops.append((reg.student_id, dropped_course))
-                    print(f"Unconditional Drop: Student {reg.student_id} dropped {dropped_course}.")
+                    self._events.debug("unconditional_drop", "Unconditional Drop: Student {student_id} dropped {course}.",
+                                       student_id=reg.student_id, course=dropped_course)
                 else:
-                    print(f"Warning: Student {reg.student_id} tried to drop non-existent course '{dropped_course}'.")
+                    self._events.warning("unknown_drop", "Warning: Student {student_id} tried to drop non-existent course '{course}'.",
+                                         student_id=reg.student_id, course=dropped_course)
 
         # 2. Create occupants for all other requests
+        if self._engine != "legacy":
+            self._compiled = CompiledInstance.build(self._courses, self._registrations)
+            self._events.info("occupants_created", "\nCreated {count} occupants for TTC.", count=self._compiled.n_occupants)
+            return
+
         for reg in self._registrations:
-            # Create occupants for 'add' requests
-            for _ in range(reg.add_requests):
-                prefs = reg.add_preferences.copy()
-                prefs.append(DUMMY_COURSE_CODE) # Fallback is to get no course
-                self._occupants.append(self._create_occupant(reg.student_id, DUMMY_COURSE_CODE, prefs))
+            # Create occupants for 'add' requests, all sharing one preference tuple
+            if reg.add_requests > 0:
+                prefs = (*reg.add_preferences, DUMMY_COURSE_CODE) # Fallback is to get no course
+                for _ in range(reg.add_requests):
+                    self._occupants.append(self._create_occupant(reg.student_id, DUMMY_COURSE_CODE, prefs))
 
             # Create occupants for conditional drops
             for drop_code, repl_prefs in reg.get_conditional_drops():
-                prefs = repl_prefs.copy()
-                prefs.append(drop_code) # Fallback is to keep the original course
+                prefs = (*repl_prefs, drop_code) # Fallback is to keep the original course
                 self._occupants.append(self._create_occupant(reg.student_id, drop_code, prefs))
 
         # 3. Set initial seats_held based on occupants' original courses
         for occ in self._occupants:
             if occ.original_course in self._courses:
                 self._courses[occ.original_course].seats_held += 1
+            self._student_occupants.setdefault(occ.student_id, set()).add(occ.occupant_id)
         
-        print(f"\nCreated {len(self._occupants)} occupants for TTC.")
+        self._events.info("occupants_created", "\nCreated {count} occupants for TTC.", count=len(self._occupants))
 
     def _get_outgoing_edge(self, occupant: Occupant, active_occupants: Dict[int, Occupant]) -> Tuple[int | None, str]:
         """Finds the top preference for an occupant, returning the target occupant and course."""
-        for pref_course_code in occupant.preferences:
+        for pref_course_code in occupant.remaining_preferences():
             if pref_course_code not in self._courses:
                 continue
 
@@ -116,23 +188,85 @@ class AddDropProcessor:
                 return (None, course.code) # Points to a free seat
 
             # Course is full, find who holds it
-            for other_occ in active_occupants.values():
+            for steps, other_occ in enumerate(active_occupants.values(), 1):
                 if other_occ.original_course == course.code:
+                    if self.stats is not None:
+                        self.stats.holder_scan_steps += steps
                     return (other_occ.occupant_id, course.code)
+            if self.stats is not None:
+                self.stats.holder_scan_steps += len(active_occupants)
         
         # No improvement possible, points to self
         return (occupant.occupant_id, occupant.original_course)
 
 
     def run(self) -> pd.DataFrame:
-        """Executes the entire add-drop process and returns the results."""
-        self._prepare_for_ttc()
-        
+        """
+        Executes the entire add-drop process and returns the results.
+        With collect_stats, the run's timers and counters are available as `self.stats`.
+        """
+        with self._phase("prepare"):
+            self._prepare_for_ttc()
+        with self._phase("ttc"):
+            self._run_ttc()
+        with self._phase("result"):
+            result_df = self._generate_result_df()
+
+        if self.stats is not None:
+            self.stats.occupants = self._compiled.n_occupants if self._compiled is not None else len(self._occupants)
+        return result_df
+
+    def compile(self) -> CompiledInstance:
+        """
+        Applies the unconditional drops and compiles the occupants without running TTC, for
+        analyses that run their own allocations on the instance. Call it instead of run().
+        """
+        if self._engine == "legacy":
+            raise ValueError("Compiling the occupants requires the 'indexed' engine.")
+        if self._compiled is None:
+            with self._phase("prepare"):
+                self._prepare_for_ttc()
+        return self._compiled
+
+    def snapshot(self) -> AllocationSnapshot:
+        """
+        Returns the allocation state after run(), including any earlier snapshot's occupants,
+        so a later round can resume from it.
+        """
+        blocks = [self._previous.occupant_block()] if self._previous is not None else []
+        drops = self._previous.unconditional_drops() if self._previous is not None else []
+        if self._compiled is not None:
+            c = self._compiled
+            final = np.where(c.final_course == UNASSIGNED, c.occ_original, c.final_course)
+            blocks.append((c.course_codes, c.student_ids, c.occ_student, c.occ_original, final))
+        elif self._occupants:
+            originals = [occ.original_course for occ in self._occupants]
+            finals = [occ.final_course if occ.final_course is not None else occ.original_course for occ in self._occupants]
+            course_ids, course_codes = pd.factorize(pd.Series(originals + finals, dtype=object))
+            occ_student, student_ids = pd.factorize(pd.Series([occ.student_id for occ in self._occupants], dtype=object))
+            blocks.append((course_codes.tolist(), student_ids.tolist(), occ_student,
+                           course_ids[:len(originals)], course_ids[len(originals):]))
+        return AllocationSnapshot.from_state(self._courses, blocks, drops + self._unconditional_drops)
+
+    def _run_ttc(self):
+        """Runs the selected TTC engine on the prepared occupants."""
+        if self._engine == "legacy":
+            self._run_legacy_ttc()
+        elif self._workers > 1:
+            run_parallel(self._compiled, self._workers, self._events, self.stats)
+            self._compiled.write_back(self._courses)
+        else:
+            IndexedTTC(self._compiled, self._events, self.stats, self._trace).run()
+            self._compiled.write_back(self._courses)
+
+    def _run_legacy_ttc(self):
+        """Runs TTC by rebuilding every occupant's edge on each iteration."""
         active_occupants = {o.occupant_id: o for o in self._occupants}
         iteration = 1
 
         while active_occupants:
-            print(f"\n--- TTC Iteration {iteration} (Active: {len(active_occupants)}) ---")
+            self._events.debug("iteration", "\n--- TTC Iteration {iteration} (Active: {active}) ---",
+                               iteration=iteration, active=len(active_occupants))
             iteration += 1
             
             # Phase 1: Point to top choices and find cycles/sinks
@@ -143,9 +277,11 @@ class AddDropProcessor:
             
             # Find cycles
             cycles = self._find_cycles(edges, active_occupants.keys())
+            if self.stats is not None:
+                self.stats.record_iteration(len(edges), len(sinks), cycles)
 
             if not sinks and not cycles:
-                print("No more assignments possible. Ending TTC.")
+                self._events.info("ttc_stalled", "No more assignments possible. Ending TTC.")
                 break
 
             # Phase 2: Resolve sinks and cycles
@@ -158,7 +294,7 @@ class AddDropProcessor:
                     _, target_course = edges[occ_id]
                     self._assign_course(occupant, target_course, active_occupants)
                     resolved_ids.add(occ_id)
-                print(f"Resolved {len(sinks)} occupants via free seats.")
+                self._events.debug("sinks_resolved", "Resolved {count} occupants via free seats.", count=len(sinks))
             
             # Resolve cycles
             if cycles:
@@ -168,15 +304,14 @@ class AddDropProcessor:
                         _, target_course = edges[occ_id]
                         self._assign_course(occupant, target_course, active_occupants)
                         resolved_ids.add(occ_id)
-                    print(f"Resolved cycle of size {len(cycle)}: {cycle}")
+                    self._events.debug("cycle_resolved", "Resolved cycle of size {size}: {cycle}", size=len(cycle), cycle=cycle)
             
-            # Remove resolved occupants from the active pool
+            # Remove resolved occupants from the active pool and the student index
             for occ_id in resolved_ids:
                 if occ_id in active_occupants:
+                    self._student_occupants[active_occupants[occ_id].student_id].discard(occ_id)
                     del active_occupants[occ_id]
 
-        return self._generate_result_df()
-
     def _assign_course(self, occupant: Occupant, new_course_code: str, active_occupants: Dict[int, Occupant]):
         """Finalizes a course assignment for an occupant and updates system state."""
         occupant.final_course = new_course_code
@@ -189,14 +324,19 @@ class AddDropProcessor:
         if new_course_code in self._courses:
             self._courses[new_course_code].seats_held += 1
 
-        print(f"  Assignment: Student {occupant.student_id} (OccID {occupant.occupant_id}) -> {new_course_code}")
+        if self._events.enabled(DEBUG):
+            self._events.debug("assignment", "  Assignment: Student {student_id} (OccID {occupant_id}) -> {course}",
+                               student_id=occupant.student_id, occupant_id=occupant.occupant_id, course=new_course_code)
 
-        # If a student gets a course, remove that course from the preferences of their other occupants
+        # If a student gets a course, remove that course from the preferences of their other occupants.
+        # Only the student's own active occupants are visited, through the per-student index.
+        removals = 0
         if new_course_code != DUMMY_COURSE_CODE:
-            for other_occ in active_occupants.values():
-                if other_occ.student_id == occupant.student_id and other_occ.occupant_id != occupant.occupant_id:
-                    if new_course_code in other_occ.preferences:
-                        other_occ.preferences.remove(new_course_code)
+            for other_id in self._student_occupants.get(occupant.student_id, ()):
+                if other_id != occupant.occupant_id and other_id in active_occupants:
+                    removals += active_occupants[other_id].prune(new_course_code)
+        if self.stats is not None:
+            self.stats.preference_removals += removals
 
     def _find_cycles(self, edges: Dict, nodes: Set[int]) -> List[List[int]]:
         """Finds all cycles in the graph defined by the edges."""
@@ -227,6 +367,9 @@ class AddDropProcessor:
             result_rows.append([student_id, dropped_course, ""])
 
         # Add results from TTC
+        if self._compiled is not None:
+            result_rows.extend(self._compiled.changed_rows())
+
         for occ in self._occupants:
             final_course = occ.final_course if occ.final_course is not None else occ.original_course
             
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, List, Tuple
+
+from .compiled import CompiledInstance, UNASSIGNED, UNLIMITED_CAPACITY
+from .processor import AddDropProcessor
+from .ttc import IndexedTTC
+from src.utils.events import EventLog, OFF
+from src.utils.helpers import extract_course_code
+
+# Name of the scenario without any capacity change, which every report starts with.
+BASELINE_SCENARIO = "baseline"
+
+@dataclass
+class ScenarioOutcome:
+    """Summary of one scenario's allocation."""
+    assignments: int
+    # Requests with a real choice that got it, and students all of whose such requests did
+    first_choices: int
+    students_first_choice: int
+    unfilled_seats: int
+
+def scenarios_from_table(df: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+    """
+    Reads scenarios from a table whose first three columns are the scenario name, a
+    course code and the change in that course's seats. Rows with the same name form
+    one scenario. The header row is optional: if its third cell is a number, it is read
+    as the first scenario row.
+    """
+    if df.shape[1] < 3:
+        raise ValueError("The scenario table needs a scenario name, a course code and a seat change on each row.")
+    if pd.notna(pd.to_numeric(pd.Series([df.columns[2]], dtype=object), errors='coerce').iloc[0]):
+        header = pd.DataFrame([list(df.columns)], columns=df.columns)
+        df = pd.concat([header, df], ignore_index=True)
+    scenarios: Dict[str, Dict[str, int]] = {}
+    changes = pd.to_numeric(df.iloc[:, 2], errors='coerce').fillna(0).astype(np.int64)
+    for name, code, change in zip(df.iloc[:, 0].astype(str).str.strip(), df.iloc[:, 1], changes.tolist()):
+        course = extract_course_code(code)
+        deltas = scenarios.setdefault(name, {})
+        deltas[course] = deltas.get(course, 0) + change
+    return scenarios
+
+def per_course_scenarios(courses_df: pd.DataFrame, seats: int) -> Dict[str, Dict[str, int]]:
+    """One scenario per course in the seat file, each adding `seats` seats to that course."""
+    codes = [extract_course_code(code) for code in courses_df.iloc[:, 0]]
+    return {f"{code} {seats:+d}": {code: seats} for code in codes if code != 'N/A'}
+
+def _first_choices(instance: CompiledInstance) -> Tuple[np.ndarray, np.ndarray]:
+    """Each occupant's first listed course, and whether that is a real choice rather than its fallback."""
+    counts = np.diff(instance.pref_offsets)
+    listed = counts > 0
+    first_choice = np.full(instance.n_occupants, UNASSIGNED, dtype=np.int32)
+    first_choice[listed] = instance.pref_courses[instance.pref_offsets[:-1][listed]]
+    return first_choice, listed & (first_choice != instance.occ_original)
+
+def _capacity(instance: CompiledInstance, deltas: Dict[str, int]) -> np.ndarray:
+    """The instance's capacities with the scenario's seat changes applied, never below zero."""
+    capacity = instance.capacity.copy()
+    index = {code: i for i, code in enumerate(instance.course_codes[:instance.n_known])}
+    for code, change in deltas.items():
+        i = index.get(code)
+        if i is None or i == instance.dummy:
+            raise ValueError(f"Scenario changes seats of '{code}', which is not in the seat file.")
+        capacity[i] = max(int(capacity[i]) + change, 0)
+    return capacity
+
+def _evaluate(instance: CompiledInstance, capacity: np.ndarray) -> ScenarioOutcome:
+    """Runs TTC with the given capacities on a copy of the instance's mutable state."""
+    scenario = replace(instance, capacity=capacity, seats_held=instance.seats_held.copy(),
+                       final_course=instance.final_course.copy())
+    IndexedTTC(scenario, EventLog(console_level=OFF)).run()
+
+    final = np.where(scenario.final_course == UNASSIGNED, scenario.occ_original, scenario.final_course)
+    first_choice, has_choice = _first_choices(scenario)
+    got = has_choice & (final == first_choice)
+    n_students = len(scenario.student_ids)
+    with_choice = np.bincount(scenario.occ_student[has_choice], minlength=n_students)
+    got_choice = np.bincount(scenario.occ_student[got], minlength=n_students)
+
+    known = np.arange(scenario.n_known)
+    known = known[(known != scenario.dummy) & (scenario.capacity[known] != UNLIMITED_CAPACITY)]
+    return ScenarioOutcome(
+        assignments=int((final != scenario.occ_original).sum()),
+        first_choices=int(got.sum()),
+        students_first_choice=int(((with_choice > 0) & (got_choice == with_choice)).sum()),
+        unfilled_seats=int(np.maximum(scenario.capacity[known] - scenario.seats_held[known], 0).sum()),
+    )
+
+def _evaluate_batch(instance: CompiledInstance, capacities: List[np.ndarray]) -> List[ScenarioOutcome]:
+    return [_evaluate(instance, capacity) for capacity in capacities]
+
+def run_sensitivity(courses_df: pd.DataFrame, registrations_df: pd.DataFrame, scenarios: Dict[str, Dict[str, int]],
+                    workers: int = 1, events: EventLog | None = None) -> pd.DataFrame:
+    """
+    Parses the inputs once and runs the allocation under each scenario, given as a map
+    from scenario name to {course code: change in seats}. Seat changes apply on top of
+    the seat file and the unconditional drops. Scenarios share the compiled occupants and
+    preferences and are spread over `workers` processes.
+
+    Returns one row per scenario, starting with the unchanged baseline: assignments
+    (occupants moved to a new course), the difference from the baseline, the share of
+    students with a real choice who got their first choice in every request that had
+    one, the same share over requests, and seats left unfilled. Raises ValueError for a
+    scenario named BASELINE_SCENARIO or one that changes a course missing from the seat file.
+    """
+    if BASELINE_SCENARIO in scenarios:
+        raise ValueError(f"'{BASELINE_SCENARIO}' is the name of the unchanged run; give the scenario another name.")
+    events = events if events is not None else EventLog()
+    processor = AddDropProcessor(courses_df, registrations_df, events=events)
+    instance = processor.compile()
+
+    names = [BASELINE_SCENARIO] + list(scenarios)
+    deltas = [scenarios.get(name, {}) for name in names]
+    capacities = [_capacity(instance, d) for d in deltas]
+
+    batches = [batch.tolist() for batch in np.array_split(np.arange(len(capacities)), max(1, workers)) if len(batch)]
+    events.info("sensitivity_started", "Running {count} capacity scenarios on {workers} workers.",
+                count=len(capacities), workers=len(batches))
+
+    outcomes: List[ScenarioOutcome] = []
+    if len(batches) <= 1:
+        outcomes = _evaluate_batch(instance, capacities)
+    else:
+        with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+            parts = pool.map(_evaluate_batch, [instance] * len(batches),
+                             [[capacities[i] for i in batch] for batch in batches])
+            for part in parts:
+                outcomes.extend(part)
+
+    return _report(instance, names, deltas, outcomes)
+
+def _report(instance: CompiledInstance, names: List[str], deltas: List[Dict[str, int]],
+            outcomes: List[ScenarioOutcome]) -> pd.DataFrame:
+    """Comparison table of the scenarios, in the order they were run."""
+    has_choice = _first_choices(instance)[1]
+    with_choice = int(has_choice.sum())
+    students_with_choice = len(np.unique(instance.occ_student[has_choice]))
+    baseline = outcomes[0]
+    return pd.DataFrame({
+        "Scenario": names,
+        "Seat Changes": [", ".join(f"{code} {change:+d}" for code, change in d.items()) for d in deltas],
+        "Assignments": [o.assignments for o in outcomes],
+        "Assignments Gained": [o.assignments - baseline.assignments for o in outcomes],
+        "Student First Choice Rate": [o.students_first_choice / students_with_choice if students_with_choice else 0.0
+                                      for o in outcomes],
+        "Request First Choice Rate": [o.first_choices / with_choice if with_choice else 0.0 for o in outcomes],
+        "Unfilled Seats": [o.unfilled_seats for o in outcomes],
+    })
@@ -0,0 +1,135 @@
+import os
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from .compiled import UNLIMITED_CAPACITY
+from .models import Course
+
+# Bumped whenever the arrays stored in a snapshot file change.
+SNAPSHOT_VERSION = 1
+
+# One batch of allocated occupants: (course_codes, student_ids, occ_student, occ_original,
+# occ_final), with courses and students given as indices into the two code lists.
+OccupantBlock = Tuple[Sequence[str], Sequence[str], np.ndarray, np.ndarray, np.ndarray]
+
+@dataclass
+class AllocationSnapshot:
+    """
+    State of a finished allocation, used to process late registrations without re-running
+    the earlier ones.
+
+    Courses below `n_known` are the seat-file courses (including the dummy course) with
+    their capacity after unconditional drops and the seats held once TTC finished; higher
+    indices are courses that only appeared in drop requests. Occupants keep their student,
+    original course and final course, and unconditional drops are kept as (student, course).
+    """
+    course_codes: List[str]
+    n_known: int
+    capacity: np.ndarray
+    seats_held: np.ndarray
+    student_ids: List[str]
+    occ_student: np.ndarray
+    occ_original: np.ndarray
+    occ_final: np.ndarray
+    drop_student: np.ndarray
+    drop_course: np.ndarray
+
+    @property
+    def n_occupants(self) -> int:
+        return len(self.occ_original)
+
+    @classmethod
+    def from_state(cls, courses: Dict[str, Course], blocks: List[OccupantBlock],
+                   unconditional_drops: List[Tuple[str, str]]) -> "AllocationSnapshot":
+        """Builds a snapshot from the processor's courses and its allocated occupants."""
+        course_codes = list(courses)
+        course_index = {code: i for i, code in enumerate(course_codes)}
+        student_ids: List[str] = []
+        student_index: Dict[str, int] = {}
+
+        def intern(codes: Sequence[str], index: Dict[str, int], target: List[str]) -> np.ndarray:
+            """Maps each code to its index in `target`, appending codes not seen yet."""
+            for code in codes:
+                if code not in index:
+                    index[code] = len(target)
+                    target.append(code)
+            return np.asarray([index[code] for code in codes], dtype=np.int32)
+
+        occ_student, occ_original, occ_final = [], [], []
+        for block_courses, block_students, student, original, final in blocks:
+            course_map = intern(block_courses, course_index, course_codes)
+            student_map = intern(block_students, student_index, student_ids)
+            occ_student.append(student_map[student])
+            occ_original.append(course_map[original])
+            occ_final.append(course_map[final])
+
+        drop_students, drop_courses = zip(*unconditional_drops) if unconditional_drops else ((), ())
+        n_known = len(courses)
+        return cls(
+            course_codes=course_codes,
+            n_known=n_known,
+            capacity=np.asarray([UNLIMITED_CAPACITY if c.capacity == float('inf') else int(c.capacity)
+                                 for c in courses.values()], dtype=np.int64),
+            seats_held=np.asarray([c.seats_held for c in courses.values()], dtype=np.int64),
+            student_ids=student_ids,
+            occ_student=np.concatenate(occ_student) if blocks else np.zeros(0, dtype=np.int32),
+            occ_original=np.concatenate(occ_original) if blocks else np.zeros(0, dtype=np.int32),
+            occ_final=np.concatenate(occ_final) if blocks else np.zeros(0, dtype=np.int32),
+            drop_student=intern(drop_students, student_index, student_ids),
+            drop_course=intern(drop_courses, course_index, course_codes),
+        )
+
+    def occupant_block(self) -> OccupantBlock:
+        return self.course_codes, self.student_ids, self.occ_student, self.occ_original, self.occ_final
+
+    def courses(self) -> Dict[str, Course]:
+        """Seat-file courses with the remaining capacity and seats held, ready for another round."""
+        return {
+            code: Course(code=code, capacity=float('inf') if capacity == UNLIMITED_CAPACITY else capacity,
+                         seats_held=held)
+            for code, capacity, held in zip(self.course_codes[:self.n_known], self.capacity.tolist(),
+                                            self.seats_held.tolist())
+        }
+
+    def unconditional_drops(self) -> List[Tuple[str, str]]:
+        return [(self.student_ids[s], self.course_codes[c])
+                for s, c in zip(self.drop_student.tolist(), self.drop_course.tolist())]
+
+    def save(self, file_path: str):
+        """Writes the snapshot as a compressed .npz archive."""
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.asarray(SNAPSHOT_VERSION),
+                course_codes=np.asarray(self.course_codes, dtype=str),
+                n_known=np.asarray(self.n_known),
+                capacity=self.capacity,
+                seats_held=self.seats_held,
+                student_ids=np.asarray(self.student_ids, dtype=str),
+                occ_student=self.occ_student,
+                occ_original=self.occ_original,
+                occ_final=self.occ_final,
+                drop_student=self.drop_student,
+                drop_course=self.drop_course,
+            )
+
+    @classmethod
+    def load(cls, file_path: str) -> "AllocationSnapshot":
+        with np.load(file_path, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"Snapshot '{file_path}' has version {version}; expected {SNAPSHOT_VERSION}.")
+            return cls(
+                course_codes=data["course_codes"].tolist(),
+                n_known=int(data["n_known"]),
+                capacity=data["capacity"],
+                seats_held=data["seats_held"],
+                student_ids=data["student_ids"].tolist(),
+                occ_student=data["occ_student"],
+                occ_original=data["occ_original"],
+                occ_final=data["occ_final"],
+                drop_student=data["drop_student"],
+                drop_course=data["drop_course"],
+            )
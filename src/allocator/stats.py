@@ -0,0 +1,74 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+
+@dataclass
+class RunStats:
+    """
+    Timers and counters collected by AddDropProcessor when created with collect_stats=True.
+
+    holder_scan_steps counts occupants looked at while searching for a course's holder;
+    for the indexed engine that is how far the per-course holder heads moved.
+    """
+    engine: str
+    phase_seconds: Dict[str, float] = field(default_factory=dict)
+    occupants: int = 0
+    iterations: int = 0
+    edges_computed: int = 0
+    sink_assignments: int = 0
+    cycle_assignments: int = 0
+    cycles: int = 0
+    cycle_sizes: Dict[int, int] = field(default_factory=dict)
+    holder_scan_steps: int = 0
+    preference_removals: int = 0
+
+    @contextmanager
+    def time_phase(self, phase: str):
+        """Adds the wall time of the enclosed block to the named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + time.perf_counter() - start
+
+    def record_iteration(self, edges_computed: int, n_sinks: int, cycles: List[List[int]]):
+        """Adds one TTC iteration's edge recomputations, sink assignments and cycles."""
+        self.iterations += 1
+        self.edges_computed += edges_computed
+        self.sink_assignments += n_sinks
+        for cycle in cycles:
+            self.cycles += 1
+            self.cycle_assignments += len(cycle)
+            self.cycle_sizes[len(cycle)] = self.cycle_sizes.get(len(cycle), 0) + 1
+
+    def merge_partition(self, other: "RunStats"):
+        """
+        Adds the counters of a partition solved separately. Partitions iterate side by
+        side, so the run's iteration count is the largest partition's.
+        """
+        self.iterations = max(self.iterations, other.iterations)
+        self.edges_computed += other.edges_computed
+        self.sink_assignments += other.sink_assignments
+        self.cycle_assignments += other.cycle_assignments
+        self.cycles += other.cycles
+        for size, count in other.cycle_sizes.items():
+            self.cycle_sizes[size] = self.cycle_sizes.get(size, 0) + count
+        self.holder_scan_steps += other.holder_scan_steps
+        self.preference_removals += other.preference_removals
+
+    def to_dict(self) -> dict:
+        stats = asdict(self)
+        stats["cycle_sizes"] = {str(size): count for size, count in sorted(self.cycle_sizes.items())}
+        return stats
+
+    def to_json(self, file_path: str | None = None) -> str:
+        """Returns the stats as JSON, also writing them to file_path if one is given."""
+        text = json.dumps(self.to_dict(), indent=2)
+        if file_path is not None:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
@@ -0,0 +1,240 @@
+import os
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, List
+
+from .compiled import CompiledInstance
+from src.utils.helpers import extract_course_code
+
+# Bumped whenever the arrays stored in a trace file change.
+TRACE_VERSION = 1
+
+# Edge target of an occupant pointing to a free seat, as in IndexedTTC.
+FREE_SEAT = -1
+
+# Marks a sink assignment in the per-assignment cycle column.
+NO_CYCLE = -1
+
+
+class TraceRecorder:
+    """
+    Collects a per-iteration audit trace of an IndexedTTC run.
+
+    Every recomputed edge (iteration, occupant, target occupant or FREE_SEAT, course) and
+    every assignment (iteration, occupant, course, cycle number or NO_CYCLE) is kept as
+    integer arrays over the instance's interned course and student IDs, appended once per
+    iteration. Edges that were not recomputed are unchanged from the previous iteration,
+    so the full edge state of any iteration can be rebuilt from them.
+    """
+    def __init__(self):
+        self._instance: CompiledInstance | None = None
+        self._initial_seats_held: np.ndarray | None = None
+        self._edges: List[np.ndarray] = []
+        self._assignments: List[np.ndarray] = []
+        self._n_cycles = 0
+        self.iterations = 0
+
+    def start(self, instance: CompiledInstance):
+        """Keeps the instance the run works on and its seat counts before TTC."""
+        self._instance = instance
+        self._initial_seats_held = instance.seats_held.copy()
+
+    def record_edges(self, iteration: int, occupants: np.ndarray, targets: np.ndarray, courses: np.ndarray):
+        self.iterations = max(self.iterations, iteration)
+        self._edges.append(np.stack([np.full(len(occupants), iteration, dtype=np.int32),
+                                     occupants.astype(np.int32), targets.astype(np.int32), courses.astype(np.int32)]))
+
+    def record_assignments(self, iteration: int, sinks: List[int], cycles: List[List[int]], courses: np.ndarray):
+        """Records the iteration's sink and cycle assignments; `courses` is the edge course of every occupant."""
+        occupants = np.asarray(sinks + [oid for cycle in cycles for oid in cycle], dtype=np.int32)
+        cycle_ids = np.asarray([NO_CYCLE] * len(sinks) + [self._n_cycles + i for i, cycle in enumerate(cycles) for _ in cycle],
+                               dtype=np.int32)
+        self._n_cycles += len(cycles)
+        self._assignments.append(np.stack([np.full(len(occupants), iteration, dtype=np.int32),
+                                           occupants, courses[occupants].astype(np.int32), cycle_ids]))
+
+    def save(self, file_path: str):
+        """Writes the trace and the instance it describes as a compressed .npz archive."""
+        inst = self._instance
+        if inst is None:
+            raise ValueError("The trace has no recorded run to save.")
+        edges = np.concatenate(self._edges, axis=1) if self._edges else np.zeros((4, 0), dtype=np.int32)
+        assignments = np.concatenate(self._assignments, axis=1) if self._assignments else np.zeros((4, 0), dtype=np.int32)
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.asarray(TRACE_VERSION),
+                course_codes=np.asarray(inst.course_codes, dtype=str),
+                n_known=np.asarray(inst.n_known),
+                dummy=np.asarray(inst.dummy),
+                capacity=inst.capacity,
+                seats_held=self._initial_seats_held,
+                student_ids=np.asarray(inst.student_ids, dtype=str),
+                occ_student=inst.occ_student,
+                occ_original=inst.occ_original,
+                pref_offsets=inst.pref_offsets,
+                pref_courses=inst.pref_courses,
+                edges=edges,
+                assignments=assignments,
+            )
+
+
+@dataclass
+class AuditTrace:
+    """
+    A saved TTC trace, queried without re-running the allocation.
+
+    `edges` and `assignments` are the TraceRecorder columns, one row each:
+    edges are (iteration, occupant, target, course) and assignments are
+    (iteration, occupant, course, cycle).
+    """
+    course_codes: List[str]
+    n_known: int
+    dummy: int
+    capacity: np.ndarray
+    seats_held: np.ndarray
+    student_ids: List[str]
+    occ_student: np.ndarray
+    occ_original: np.ndarray
+    pref_offsets: np.ndarray
+    pref_courses: np.ndarray
+    edges: np.ndarray
+    assignments: np.ndarray
+
+    @classmethod
+    def load(cls, file_path: str) -> "AuditTrace":
+        with np.load(file_path, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != TRACE_VERSION:
+                raise ValueError(f"Trace '{file_path}' has version {version}; expected {TRACE_VERSION}.")
+            return cls(
+                course_codes=data["course_codes"].tolist(),
+                n_known=int(data["n_known"]),
+                dummy=int(data["dummy"]),
+                capacity=data["capacity"],
+                seats_held=data["seats_held"],
+                student_ids=data["student_ids"].tolist(),
+                occ_student=data["occ_student"],
+                occ_original=data["occ_original"],
+                pref_offsets=data["pref_offsets"],
+                pref_courses=data["pref_courses"],
+                edges=data["edges"],
+                assignments=data["assignments"],
+            )
+
+    @property
+    def iterations(self) -> int:
+        return int(self.edges[0].max()) if self.edges.shape[1] else 0
+
+    def _course_index(self, code: str) -> int:
+        """Index of the course, normalized the way the parsers read course cells."""
+        try:
+            return self.course_codes.index(extract_course_code(code))
+        except ValueError:
+            raise ValueError(f"Course '{code}' does not appear in the trace.")
+
+    def _student_index(self, student_id: str) -> int:
+        """Index of the student, matching IDs without surrounding spaces or case, as the verifier does."""
+        wanted = str(student_id).strip().upper()
+        for i, sid in enumerate(self.student_ids):
+            if sid.strip().upper() == wanted:
+                return i
+        raise ValueError(f"Student '{student_id}' does not appear in the trace.")
+
+    def _check_iteration(self, iteration: int):
+        """Iterations run from 1; one past the last is the state after TTC finished."""
+        if not 1 <= iteration <= self.iterations + 1:
+            raise ValueError(f"Iteration {iteration} is outside this trace, which covers iterations 1 to "
+                             f"{self.iterations} (use {self.iterations + 1} for the final state).")
+
+    def _assigned_at(self) -> tuple[np.ndarray, np.ndarray]:
+        """Iteration in which each occupant was assigned (0 if never) and its final course."""
+        n = len(self.occ_original)
+        iteration = np.zeros(n, dtype=np.int32)
+        final = self.occ_original.copy()
+        it, occ, course, _ = self.assignments
+        iteration[occ] = it
+        final[occ] = course
+        return iteration, final
+
+    def _describe(self, course: int, target: int) -> str:
+        if target == FREE_SEAT:
+            return f"free seat in {self.course_codes[course]}"
+        return (f"{self.course_codes[course]}, held by occupant {target} "
+                f"(student {self.student_ids[self.occ_student[target]]})")
+
+    def explain_student(self, student_id: str) -> pd.DataFrame:
+        """
+        Every occupant of the student with its preferences, each edge it pointed along, and
+        how it was assigned: to a free seat, in a trade cycle, or never (keeping its course).
+        """
+        student = self._student_index(student_id)
+        assigned_at, final = self._assigned_at()
+        codes = self.course_codes
+        e_it, e_occ, e_target, e_course = self.edges
+        a_it, a_occ, _, a_cycle = self.assignments
+
+        rows = []
+        for oid in np.flatnonzero(self.occ_student == student).tolist():
+            prefs = [codes[c] for c in self.pref_courses[self.pref_offsets[oid]:self.pref_offsets[oid + 1]].tolist()]
+            original = int(self.occ_original[oid])
+            rows.append([0, oid, "request", "" if original == self.dummy else codes[original],
+                         "preferences: " + ", ".join(prefs)])
+            for i in np.flatnonzero(e_occ == oid).tolist():
+                target, course = int(e_target[i]), int(e_course[i])
+                listed = codes[course] in prefs
+                if target != oid:
+                    detail = "points to " + self._describe(course, target)
+                elif listed:
+                    detail = f"keeps its current course {codes[course]} as its best remaining option"
+                else:
+                    detail = f"no usable preference; keeps its current course {codes[course]}"
+                # Earlier preferences were full with no active holder, or already taken by the student
+                skipped = prefs[:prefs.index(codes[course])] if listed else prefs
+                if skipped:
+                    detail += "; skipped " + ", ".join(skipped)
+                rows.append([int(e_it[i]), oid, "edge", codes[course], detail])
+            if assigned_at[oid]:
+                cycle = int(a_cycle[np.flatnonzero(a_occ == oid)[0]])
+                members = a_occ[a_cycle == cycle].tolist() if cycle != NO_CYCLE else []
+                if cycle == NO_CYCLE:
+                    event, how = "assigned", "took a free seat"
+                elif len(members) == 1:
+                    # A cycle of one is the occupant pointing to itself: nothing was traded
+                    event, how = "kept", "kept its original course"
+                else:
+                    event, how = "assigned", f"traded in cycle {cycle} with occupants {members}"
+                rows.append([int(assigned_at[oid]), oid, event, codes[final[oid]], how])
+            else:
+                rows.append([self.iterations, oid, "unassigned", codes[original], "kept its original course"])
+        return pd.DataFrame(rows, columns=["Iteration", "Occupant", "Event", "Course", "Detail"])
+
+    def course_holders(self, course_code: str, iteration: int) -> pd.DataFrame:
+        """
+        Occupants holding the course at the start of the given iteration: those still
+        active with it as their original course, and those assigned into it earlier.
+        """
+        self._check_iteration(iteration)
+        course = self._course_index(course_code)
+        assigned_at, final = self._assigned_at()
+        done = (assigned_at > 0) & (assigned_at < iteration)
+        current = np.where(done, final, self.occ_original)
+        holders = np.flatnonzero(current == course)
+        return pd.DataFrame({
+            "Occupant": holders,
+            "Student ID": np.asarray(self.student_ids, dtype=object)[self.occ_student[holders]],
+            "Status": np.where(done[holders], "assigned", "active"),
+            "Assigned In Iteration": np.where(done[holders], assigned_at[holders], 0),
+        })
+
+    def seat_summary(self, course_code: str, iteration: int) -> Dict[str, int]:
+        """Capacity and seats held of the course at the start of the given iteration."""
+        self._check_iteration(iteration)
+        course = self._course_index(course_code)
+        it, occ, target_course, _ = self.assignments
+        before = it < iteration
+        held = (int(self.seats_held[course]) - int((self.occ_original[occ[before]] == course).sum())
+                + int((target_course[before] == course).sum()))
+        return {"capacity": int(self.capacity[course]), "seats_held": held}
@@ -0,0 +1,242 @@
+import numpy as np
+from typing import List, Set
+
+from .compiled import CompiledInstance
+from .stats import RunStats
+from .trace import TraceRecorder
+from src.utils.events import DEBUG, EventLog
+
+# Edge target of an occupant pointing to a free seat.
+FREE_SEAT = -1
+
+
+def _group_by(keys: np.ndarray, n_groups: int) -> tuple[np.ndarray, np.ndarray]:
+    """Groups positions by key as CSR offsets and members, keeping positions ascending."""
+    members = np.argsort(keys, kind="stable").astype(np.int32)
+    offsets = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n_groups), out=offsets[1:])
+    return offsets, members
+
+
+class IndexedTTC:
+    """
+    Incremental Top Trading Cycles engine over a CompiledInstance.
+
+    Produces the same assignments as the legacy loop in AddDropProcessor, but instead of
+    rebuilding every edge each iteration it keeps:
+      - a course -> holders index (occupant IDs in ascending order) with a moving head,
+      - a per-occupant pointer into its preference range,
+      - a course -> occupants index of who currently points at each course,
+    and only recomputes edges of occupants whose target course changed state.
+    Pruned preferences are masked out instead of removed, so the loop does not allocate.
+    With a TraceRecorder, each iteration's recomputed edges and assignments are recorded.
+    """
+    def __init__(self, instance: CompiledInstance, events: EventLog, stats: RunStats | None = None,
+                 trace: TraceRecorder | None = None):
+        self._inst = instance
+        self._events = events
+        self._stats = stats
+        self._trace = trace
+        if trace is not None:
+            trace.start(instance)
+        self._preference_removals = 0
+        # Checked once so a run without detailed logging pays nothing per assignment
+        self._log_assignments = events.enabled(DEBUG)
+        n = instance.n_occupants
+
+        self._active = np.ones(n, dtype=np.uint8)
+        self.n_active = n
+
+        # Holders are grouped in occupant ID order, so the first active entry is the
+        # same holder the legacy engine finds by scanning active occupants.
+        self._holder_offsets, self._holder_ids = _group_by(instance.occ_original, instance.n_courses)
+        self._holder_head = self._holder_offsets[:-1].copy()
+        self._student_offsets, self._student_occs = _group_by(instance.occ_student, len(instance.student_ids))
+
+        self._pointers = instance.pref_offsets[:-1].copy()
+        self._pref_removed = np.zeros(len(instance.pref_courses), dtype=np.uint8)
+        self._edge_target = np.full(n, FREE_SEAT, dtype=np.int32)
+        self._edge_course = np.full(n, -1, dtype=np.int32)
+        self._pointed_by: List[Set[int]] = [set() for _ in range(instance.n_courses)]
+        self._sinks: Set[int] = set()
+
+        # Memoryviews give plain-int element access to the arrays in the hot loop
+        self._mv_active = memoryview(self._active)
+        self._mv_holder_ids = memoryview(self._holder_ids)
+        self._mv_holder_head = memoryview(self._holder_head)
+        self._mv_holder_end = memoryview(self._holder_offsets[1:].copy())
+        self._mv_pointers = memoryview(self._pointers)
+        self._mv_pref_start = memoryview(instance.pref_offsets[:-1].copy())
+        self._mv_pref_end = memoryview(instance.pref_offsets[1:].copy())
+        self._mv_occ_original = memoryview(instance.occ_original)
+        self._mv_pref_courses = memoryview(instance.pref_courses)
+        self._mv_pref_removed = memoryview(self._pref_removed)
+        self._mv_capacity = memoryview(instance.capacity)
+        self._mv_seats_held = memoryview(instance.seats_held)
+        self._mv_edge_target = memoryview(self._edge_target)
+        self._mv_edge_course = memoryview(self._edge_course)
+
+    def _first_active_holder(self, course: int) -> int:
+        """Returns the lowest active occupant ID holding the course, or -1 if none is left."""
+        active, holder_ids = self._mv_active, self._mv_holder_ids
+        head, end = self._mv_holder_head[course], self._mv_holder_end[course]
+        while head < end and not active[holder_ids[head]]:
+            head += 1
+        self._mv_holder_head[course] = head
+        return holder_ids[head] if head < end else -1
+
+    def _compute_edge(self, oid: int):
+        """
+        Advances the occupant's preference pointer to its first usable course and stores the edge.
+        A course that is full with no active holder can never become usable again, so the
+        pointer only moves forward.
+        """
+        edge_course = self._mv_edge_course
+        old_course = edge_course[oid]
+        if old_course >= 0:
+            self._pointed_by[old_course].discard(oid)
+            self._sinks.discard(oid)
+
+        prefs, removed = self._mv_pref_courses, self._mv_pref_removed
+        capacity, seats_held = self._mv_capacity, self._mv_seats_held
+        p, end = self._mv_pointers[oid], self._mv_pref_end[oid]
+        target, course = oid, self._mv_occ_original[oid]
+        while p < end:
+            if not removed[p]:
+                c = prefs[p]
+                if seats_held[c] < capacity[c]:
+                    target, course = FREE_SEAT, c
+                    break
+                holder = self._first_active_holder(c)
+                if holder >= 0:
+                    target, course = holder, c
+                    break
+            p += 1
+        self._mv_pointers[oid] = p
+
+        self._mv_edge_target[oid] = target
+        edge_course[oid] = course
+        self._pointed_by[course].add(oid)
+        if target == FREE_SEAT:
+            self._sinks.add(oid)
+
+    def _find_cycles(self, starts: Set[int]) -> List[List[int]]:
+        """
+        Finds all cycles reachable from the given occupants. Every cycle of the previous
+        iteration was resolved, so any new cycle must contain a recomputed edge.
+        """
+        edge_target = self._mv_edge_target
+        all_cycles = []
+        visited = set()
+        for node in starts:
+            if node in visited:
+                continue
+
+            path = []
+            curr = node
+            while curr != FREE_SEAT and curr not in visited:
+                visited.add(curr)
+                path.append(curr)
+                curr = edge_target[curr]
+
+            if curr in path:
+                cycle_start_index = path.index(curr)
+                all_cycles.append(path[cycle_start_index:])
+        return all_cycles
+
+    def _assign(self, oid: int, course: int, pruned: Set[int]):
+        """
+        Finalizes an assignment and masks the course out of the preferences of the
+        student's other active occupants, collecting them into `pruned`.
+        """
+        inst = self._inst
+        inst.final_course[oid] = course
+        seats_held = self._mv_seats_held
+        seats_held[self._mv_occ_original[oid]] -= 1
+        seats_held[course] += 1
+
+        student = int(inst.occ_student[oid])
+        if self._log_assignments:
+            self._events.debug("assignment", "  Assignment: Student {student_id} (OccID {occupant_id}) -> {course}",
+                               student_id=inst.student_ids[student], occupant_id=oid, course=inst.course_codes[course])
+
+        if course == inst.dummy:
+            return
+        active, prefs, removed = self._mv_active, self._mv_pref_courses, self._mv_pref_removed
+        for other in self._student_occs[self._student_offsets[student]:self._student_offsets[student + 1]].tolist():
+            if other == oid or not active[other]:
+                continue
+            for p in range(self._mv_pref_start[other], self._mv_pref_end[other]):
+                if prefs[p] == course and not removed[p]:
+                    removed[p] = 1
+                    pruned.add(other)
+                    self._preference_removals += 1
+                    break
+
+    def run(self):
+        """Runs TTC to completion, storing final courses on the compiled instance."""
+        inst = self._inst
+        edge_course = self._mv_edge_course
+        dirty = set(range(inst.n_occupants))
+        iteration = 1
+
+        while self.n_active:
+            self._events.debug("iteration", "\n--- TTC Iteration {iteration} (Active: {active}) ---",
+                               iteration=iteration, active=self.n_active)
+            iteration += 1
+
+            # Phase 1: Recompute only the edges that may have changed
+            for oid in dirty:
+                self._compute_edge(oid)
+            if self._trace is not None:
+                recomputed = np.fromiter(dirty, dtype=np.int32, count=len(dirty))
+                self._trace.record_edges(iteration - 1, recomputed, self._edge_target[recomputed], self._edge_course[recomputed])
+
+            sinks = list(self._sinks)
+            cycles = self._find_cycles(dirty)
+            if self._stats is not None:
+                self._stats.record_iteration(len(dirty), len(sinks), cycles)
+
+            if not sinks and not cycles:
+                self._events.info("ttc_stalled", "No more assignments possible. Ending TTC.")
+                break
+
+            # Phase 2: Resolve sinks and cycles against this iteration's edges
+            resolved_ids = []
+            pruned = set()
+
+            if sinks:
+                for occ_id in sinks:
+                    self._assign(occ_id, edge_course[occ_id], pruned)
+                resolved_ids.extend(sinks)
+                self._events.debug("sinks_resolved", "Resolved {count} occupants via free seats.", count=len(sinks))
+
+            if cycles:
+                for cycle in cycles:
+                    for occ_id in cycle:
+                        self._assign(occ_id, edge_course[occ_id], pruned)
+                    resolved_ids.extend(cycle)
+                    self._events.debug("cycle_resolved", "Resolved cycle of size {size}: {cycle}", size=len(cycle), cycle=cycle)
+            if self._trace is not None:
+                self._trace.record_assignments(iteration - 1, sinks, cycles, self._edge_course)
+
+            # Remove resolved occupants from the active pool and the indexes
+            touched_courses = set()
+            for occ_id in resolved_ids:
+                self._active[occ_id] = 0
+                course = edge_course[occ_id]
+                self._pointed_by[course].discard(occ_id)
+                self._sinks.discard(occ_id)
+                touched_courses.add(course)
+                touched_courses.add(self._mv_occ_original[occ_id])
+            self.n_active -= len(resolved_ids)
+
+            # Occupants pointing at a course whose seats or holders changed need a new edge
+            dirty = {oid for oid in pruned if self._active[oid]}
+            for course in touched_courses:
+                dirty.update(self._pointed_by[course])
+
+        if self._stats is not None:
+            # Counters that the indexes already track are read off at the end instead of per step
+            self._stats.holder_scan_steps += int((self._holder_head - self._holder_offsets[:-1]).sum())
+            self._stats.preference_removals += self._preference_removals
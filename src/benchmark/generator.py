@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Tuple
+
+from src.utils.helpers import ADD_PREF_COLS, DROP_SLOT_COLS
+
+# Header of a generated registration sheet. Only the positions matter to the parsers;
+# the names mirror the registration form.
+REGISTRATION_COLUMNS = (
+    ["Timestamp", "Name", "Student ID", "Email", "Programme", "Number of Courses to Add"]
+    + [f"Add Preference {i + 1}" for i in range(len(ADD_PREF_COLS))]
+    + [name for k, (_, repl_cols) in enumerate(DROP_SLOT_COLS)
+       for name in [f"Drop Course {k + 1}"] + [f"Replacement {k + 1}.{j + 1}" for j in range(len(repl_cols))]]
+)
+
+_CODE_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+@dataclass
+class WorkloadSpec:
+    """
+    Parameters of a synthetic add/drop workload.
+
+    tightness is demand over free seats: 1.0 has one free seat per occupant, higher values
+    leave more occupants competing for each seat. full_course_share is the share of courses
+    that get no free seats, so requests for them have to trade with the holders.
+    popularity_skew is the Zipf exponent of course popularity for add and replacement
+    preferences (0 is uniform). Courses and students are split into n_departments, and
+    students pick courses of other departments only at cross_department_rate.
+    """
+    n_students: int = 1000
+    n_courses: int = 50
+    tightness: float = 2.0
+    full_course_share: float = 0.5
+    add_rate: float = 0.6           # Share of students submitting add requests
+    drop_rate: float = 0.3          # Chance that each of the three drop slots is used
+    unconditional_rate: float = 0.3 # Share of drops without replacement preferences
+    popularity_skew: float = 1.0
+    n_departments: int = 1
+    cross_department_rate: float = 0.01
+    seed: int = 0
+
+    def expected_occupants_per_student(self) -> float:
+        """Average number of TTC occupants one generated student produces."""
+        n_drop_slots = len(DROP_SLOT_COLS)
+        return self.add_rate * 1.5 + n_drop_slots * self.drop_rate * (1 - self.unconditional_rate)
+
+    @classmethod
+    def for_occupants(cls, n_occupants: int, **kwargs) -> "WorkloadSpec":
+        """Returns a spec sized to produce roughly n_occupants occupants."""
+        spec = cls(**kwargs)
+        spec.n_students = max(1, round(n_occupants / spec.expected_occupants_per_student()))
+        return spec
+
+def course_codes(n_courses: int) -> np.ndarray:
+    """Five-character course codes: 'C' followed by a base-36 number."""
+    codes = []
+    for i in range(n_courses):
+        digits = ""
+        for _ in range(4):
+            i, r = divmod(i, 36)
+            digits = _CODE_DIGITS[r] + digits
+        codes.append("C" + digits)
+    return np.asarray(codes, dtype=object)
+
+def _blank_after(codes: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Blanks the cells of each row beyond the first counts[row] columns."""
+    keep = np.arange(codes.shape[1])[None, :] < counts[:, None]
+    return np.where(keep, codes, None)
+
+def generate_workload(spec: WorkloadSpec) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Generates (courses_df, registrations_df) in the column layout read by AddDropProcessor.
+    Once unconditional drops are processed, course capacities cover every seat held by a
+    conditional drop plus the free seats implied by the tightness.
+    """
+    rng = np.random.default_rng(spec.seed)
+    n = spec.n_students
+    codes = course_codes(spec.n_courses)
+
+    # Departments own contiguous blocks of courses; popularity ranks restart in each block
+    n_departments = max(1, min(spec.n_departments, spec.n_courses))
+    bounds = np.linspace(0, spec.n_courses, n_departments + 1).astype(np.int64)
+    dept_start, dept_size = bounds[:-1], np.diff(bounds)
+    student_dept = rng.integers(0, n_departments, size=n)
+
+    def zipf(size: int) -> np.ndarray:
+        weights = 1.0 / np.arange(1, size + 1) ** spec.popularity_skew
+        return weights / weights.sum()
+    local_popularity = zipf(int(dept_size.max()))
+    global_popularity = zipf(spec.n_courses)
+
+    def pick(shape: tuple, popular: bool) -> np.ndarray:
+        """Course indices for each student row, within the student's department unless crossing."""
+        dept = student_dept[:, None]
+        if popular:
+            local = rng.choice(len(local_popularity), size=shape, p=local_popularity)
+            anywhere = rng.choice(spec.n_courses, size=shape, p=global_popularity)
+        else:
+            local = rng.integers(0, dept_size.max(), size=shape)
+            anywhere = rng.integers(0, spec.n_courses, size=shape)
+        within = dept_start[dept] + local % dept_size[dept]
+        return np.where(rng.random(shape) < spec.cross_department_rate, anywhere, within)
+
+    def preferences(rows: int, cols: int) -> np.ndarray:
+        return codes[pick((rows, cols), popular=True)]
+
+    # Add requests: one or two occupants with one to four preferences each
+    n_adds = np.where(rng.random(n) < spec.add_rate, rng.integers(1, 3, size=n), 0)
+    add_prefs = _blank_after(preferences(n, len(ADD_PREF_COLS)), np.where(n_adds > 0, rng.integers(1, len(ADD_PREF_COLS) + 1, size=n), 0))
+
+    # Drop requests: each slot drops a held course, with up to three replacements
+    held = np.zeros(spec.n_courses, dtype=np.int64)
+    released = np.zeros(spec.n_courses, dtype=np.int64)
+    n_conditional = 0
+    drop_blocks = []
+    for _, repl_cols in DROP_SLOT_COLS:
+        has_drop = rng.random(n) < spec.drop_rate
+        dropped = pick((n, 1), popular=False)[:, 0]
+        n_repls = np.where(rng.random(n) < spec.unconditional_rate, 0, rng.integers(1, len(repl_cols) + 1, size=n))
+        n_repls = np.where(has_drop, n_repls, 0)
+        conditional = has_drop & (n_repls > 0)
+        held += np.bincount(dropped[conditional], minlength=spec.n_courses)
+        released += np.bincount(dropped[has_drop & (n_repls == 0)], minlength=spec.n_courses)
+        n_conditional += int(conditional.sum())
+        drop_blocks.append(np.where(has_drop, codes[dropped], None)[:, None])
+        drop_blocks.append(_blank_after(preferences(n, len(repl_cols)), n_repls))
+
+    # Free seats for the total demand are spread evenly over the courses that are not full,
+    # so popular courses are oversubscribed
+    demand = int(n_adds.sum()) + n_conditional
+    free_seats = int(np.ceil(demand / spec.tightness)) if spec.tightness > 0 else 0
+    # Unconditional drops add a seat each when processed, so they are netted out here
+    has_free = rng.random(spec.n_courses) >= spec.full_course_share
+    capacity = np.maximum(held - released, 0)
+    if has_free.any():
+        capacity[has_free] += rng.multinomial(free_seats, np.full(int(has_free.sum()), 1.0 / has_free.sum()))
+    courses_df = pd.DataFrame({"Course": codes, "Seats": capacity})
+
+    # Columns before the add preferences: timestamp, name, student ID, email, programme, number of adds
+    student_ids = np.char.add("S", np.char.zfill(np.arange(n).astype(str), 7)).astype(object)
+    blank = np.full((n, 1), None, dtype=object)
+    columns = [blank, blank, student_ids[:, None], blank, blank, n_adds[:, None].astype(object), add_prefs] + drop_blocks
+    registrations_df = pd.DataFrame(np.hstack(columns), columns=REGISTRATION_COLUMNS)
+    return courses_df, registrations_df
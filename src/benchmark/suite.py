@@ -0,0 +1,123 @@
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from src.allocator.processor import AddDropProcessor
+from src.utils.events import EventLog, OFF
+from .generator import WorkloadSpec, generate_workload
+
+# Phases timed separately, in run order.
+PHASES = ("parse", "prepare", "ttc", "result")
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+@dataclass
+class PhaseMeasurement:
+    """Wall time and peak traced memory of one phase at one workload size."""
+    size: int
+    n_students: int
+    n_occupants: int
+    engine: str
+    phase: str
+    seconds: float
+    peak_mb: float | None
+
+def _phase_steps(courses_df: pd.DataFrame, registrations_df: pd.DataFrame, engine: str,
+                 state: dict) -> Dict[str, Callable]:
+    """Returns the allocation split into its phases, sharing one processor stored in `state`."""
+
+    def parse():
+        state["processor"] = AddDropProcessor(courses_df, registrations_df, engine=engine,
+                                              events=EventLog(console_level=OFF))
+    return {
+        "parse": parse,
+        "prepare": lambda: state["processor"]._prepare_for_ttc(),
+        "ttc": lambda: state["processor"]._run_ttc(),
+        "result": lambda: state["processor"]._generate_result_df(),
+    }
+
+def _time_phases(courses_df: pd.DataFrame, registrations_df: pd.DataFrame, engine: str) -> tuple[Dict[str, float], int]:
+    """Wall time in seconds of each phase, and the number of occupants the run created."""
+    timings, state = {}, {}
+    for phase, step in _phase_steps(courses_df, registrations_df, engine, state).items():
+        start = time.perf_counter()
+        step()
+        timings[phase] = time.perf_counter() - start
+    processor = state["processor"]
+    n_occupants = processor._compiled.n_occupants if processor._compiled is not None else len(processor._occupants)
+    return timings, n_occupants
+
+def _peak_memory_phases(courses_df: pd.DataFrame, registrations_df: pd.DataFrame, engine: str) -> Dict[str, float]:
+    """Peak traced memory in MB during each phase, including what earlier phases still hold."""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for phase, step in _phase_steps(courses_df, registrations_df, engine, {}).items():
+            tracemalloc.reset_peak()
+            step()
+            peaks[phase] = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def run_benchmark(sizes: List[int] = DEFAULT_SIZES, engine: str = "indexed", measure_memory: bool = True,
+                  **spec_kwargs) -> pd.DataFrame:
+    """
+    Generates a workload of roughly each size (in occupants) and measures every phase.
+    Timing and memory are measured in separate runs, since tracing slows allocations down.
+    """
+    rows = []
+    for size in sizes:
+        spec = WorkloadSpec.for_occupants(size, **spec_kwargs)
+        courses_df, registrations_df = generate_workload(spec)
+        print(f"Benchmarking {size} occupants ({spec.n_students} students, {spec.n_courses} courses)...")
+
+        timings, n_occupants = _time_phases(courses_df, registrations_df, engine)
+        peaks = _peak_memory_phases(courses_df, registrations_df, engine) if measure_memory else {}
+        for phase in PHASES:
+            rows.append(asdict(PhaseMeasurement(
+                size=size, n_students=spec.n_students, n_occupants=n_occupants, engine=engine,
+                phase=phase, seconds=round(timings[phase], 4),
+                peak_mb=round(peaks[phase], 2) if phase in peaks else None,
+            )))
+    return pd.DataFrame(rows)
+
+def run_assignment_cost(sizes: List[int] = DEFAULT_SIZES[:3], samples: int = 2_000, **spec_kwargs) -> pd.DataFrame:
+    """
+    Mean wall time of one legacy-engine assignment, including pruning the assigned course
+    from the student's other occupants, on workloads of roughly each size (in occupants).
+    Each sampled occupant is assigned its first preference with every occupant still active,
+    so the cost should not grow with the number of students.
+    """
+    rows = []
+    for size in sizes:
+        spec = WorkloadSpec.for_occupants(size, **spec_kwargs)
+        courses_df, registrations_df = generate_workload(spec)
+        processor = AddDropProcessor(courses_df, registrations_df, engine="legacy", events=EventLog(console_level=OFF))
+        processor._prepare_for_ttc()
+        active = {occ.occupant_id: occ for occ in processor._occupants}
+        sampled = processor._occupants[::max(len(processor._occupants) // samples, 1)][:samples]
+
+        start = time.perf_counter()
+        for occ in sampled:
+            processor._assign_course(occ, occ.preferences[0], active)
+        seconds = time.perf_counter() - start
+        rows.append({"size": size, "n_students": spec.n_students, "n_occupants": len(active),
+                     "assignments": len(sampled), "us_per_assignment": round(seconds / max(len(sampled), 1) * 1e6, 2)})
+    return pd.DataFrame(rows)
+
+def compare_results(current: pd.DataFrame, baseline: pd.DataFrame) -> pd.DataFrame:
+    """Joins two benchmark tables on size and phase and adds current/baseline ratios."""
+    # A baseline read back from CSV holds text cells
+    baseline = baseline.assign(**{col: pd.to_numeric(baseline[col], errors="coerce")
+                                  for col in ("size", "seconds", "peak_mb") if col in baseline})
+    merged = current.merge(baseline, on=["size", "phase"], suffixes=("", "_baseline"))
+    merged["time_ratio"] = (merged["seconds"] / merged["seconds_baseline"]).round(2)
+    if merged["peak_mb"].notna().any() and merged["peak_mb_baseline"].notna().any():
+        merged["memory_ratio"] = (merged["peak_mb"] / merged["peak_mb_baseline"]).round(2)
+    columns = ["size", "phase", "seconds", "seconds_baseline", "time_ratio"]
+    if "memory_ratio" in merged:
+        columns += ["peak_mb", "peak_mb_baseline", "memory_ratio"]
+    return merged[columns]
@@ -0,0 +1,129 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.allocator.models import Registration
+from src.allocator.processor import AddDropProcessor
+from src.utils.events import EventLog
+from src.utils.file_io import save_dataframe
+from src.utils.shuffle import new_seed
+from src.verifier.optimality import OptimalityChecker
+from src.verifier.verifier import ResultVerifier
+
+
+class BackgroundWriter:
+    """
+    Saves DataFrames on a background thread so the next stage can start while a file is
+    written. wait() blocks until every queued write has finished.
+    """
+    def __init__(self, enabled: bool = True):
+        self._pool = ThreadPoolExecutor(max_workers=1) if enabled else None
+        self._pending: List[Future] = []
+
+    def save(self, df: pd.DataFrame, file_path: str | None):
+        """Queues the DataFrame for saving, or saves it right away without a background thread."""
+        if file_path is None:
+            return
+        if self._pool is None:
+            save_dataframe(df, file_path)
+        else:
+            self._pending.append(self._pool.submit(save_dataframe, df, file_path))
+
+    def wait(self):
+        for future in self._pending:
+            future.result()
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+@dataclass
+class PipelineResult:
+    """Outputs of a pipeline run, the shuffle seed it used and the wall time of each stage, in run order."""
+    seed: int
+    shuffled: pd.DataFrame
+    result: pd.DataFrame
+    verified: bool
+    verifier: ResultVerifier
+    optimality: OptimalityChecker | None = None
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+
+    def timings(self) -> pd.DataFrame:
+        return pd.DataFrame({"Stage": list(self.stage_seconds),
+                             "Seconds": [round(s, 3) for s in self.stage_seconds.values()]})
+
+
+def run_pipeline(courses_df: pd.DataFrame, original_df: pd.DataFrame, seed: int | None = None,
+                 engine: str = "indexed", workers: int = 1, full: bool = False, certify: bool = False,
+                 shuffled_output: str | None = None, result_output: str | None = None,
+                 background_writes: bool = True, events: EventLog | None = None,
+                 registrations: List[Registration] | None = None,
+                 registration_table: pd.DataFrame | None = None) -> PipelineResult:
+    """
+    Runs the randomizer, the allocation and the verifier in one process. Stages hand over
+    DataFrames in memory, so the shuffled registrations and the result are never read back
+    from disk. They are only written when an output path is given; with background_writes
+    the writes overlap with the later stages.
+
+    The shuffle matches 1_run_randomizer.py with the same seed; without one, a new seed is
+    drawn and returned so the run can be replayed. `full` and `certify` select the
+    verifier's invariant mode and the optimality check.
+
+    `registrations` (from AddDropProcessor.parsed_input()) and `registration_table` (from
+    the verifier's registration_table()) may hold original_df already parsed, in its own
+    row order, for example from the parse cache. Both are parsed row by row, so they are
+    reordered with the shuffle instead of parsing the shuffled rows again.
+    """
+    if certify and engine == "legacy":
+        raise ValueError("The optimality check needs the indexed engine.")
+    events = events if events is not None else EventLog()
+    stage_seconds: Dict[str, float] = {}
+    seed = seed if seed is not None else new_seed()
+
+    @contextmanager
+    def stage(name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage_seconds[name] = time.perf_counter() - start
+
+    writer = BackgroundWriter(background_writes)
+    try:
+        with stage("randomize"):
+            # Row positions in shuffled order; sample() draws the same permutation as on original_df
+            order = pd.Series(np.arange(len(original_df))).sample(frac=1, random_state=seed).to_numpy()
+            shuffled = original_df.iloc[order].reset_index(drop=True)
+            if registrations is not None:
+                registrations = [registrations[i] for i in order.tolist()]
+            if registration_table is not None:
+                registration_table = registration_table.iloc[order].reset_index(drop=True)
+        writer.save(shuffled, shuffled_output)
+
+        with stage("allocate"):
+            processor = AddDropProcessor(courses_df, shuffled, engine=engine, events=events, workers=workers,
+                                         registrations=registrations)
+            result = processor.run()
+        writer.save(result, result_output)
+
+        with stage("verify"):
+            verifier = ResultVerifier(registration_df=shuffled, result_df=result, seats_df=courses_df,
+                                      registrations=registration_table)
+            verified = verifier.verify(full=full)
+
+        checker = None
+        if certify:
+            with stage("certify"):
+                checker = OptimalityChecker.from_processor(processor)
+                checker.check()
+    finally:
+        with stage("write"):
+            writer.wait()
+
+    return PipelineResult(seed=seed, shuffled=shuffled, result=result, verified=verified, verifier=verifier,
+                          optimality=checker, stage_seconds=stage_seconds)
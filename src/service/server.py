@@ -0,0 +1,105 @@
+import asyncio
+import json
+from typing import Tuple
+from urllib.parse import unquote, urlsplit
+
+from src.utils.events import EventLog
+from .whatif import WhatIfState, registration_from_dict
+
+# Largest request body accepted, in bytes.
+MAX_BODY_BYTES = 1 << 20
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+class QueryServer:
+    """
+    Minimal HTTP/1.1 JSON server on asyncio streams that answers queries against a WhatIfState.
+
+      GET  /health              -> {"status": "ok"}
+      GET  /seats               -> seat state of every course
+      GET  /seats/<course>      -> seat state of one course
+      POST /whatif              -> what a registration would get now (seats unchanged)
+      POST /registrations       -> allocate a registration against the live seats and keep it
+                                   (409 if the student has already committed one)
+      GET  /registrations       -> every committed registration's outcome
+
+    Registrations are JSON objects as accepted by registration_from_dict. Each connection
+    carries one request. Queries run on the event loop one at a time, so a commit is never
+    interleaved with another query.
+    """
+    def __init__(self, state: WhatIfState, events: EventLog | None = None):
+        self._state = state
+        self._events = events if events is not None else EventLog()
+
+    def route(self, method: str, path: str, body: bytes) -> Tuple[int, object]:
+        """Answers one request, returning the status code and the JSON-serializable payload."""
+        parts = [unquote(p) for p in urlsplit(path).path.split("/") if p]
+        if parts == ["health"]:
+            return 200, {"status": "ok"}
+        if parts[:1] == ["seats"] and len(parts) <= 2:
+            if method != "GET":
+                return 405, {"error": "Use GET."}
+            seats = self._state.seats(parts[1] if len(parts) == 2 else None)
+            if len(parts) == 2:
+                return (200, seats[0]) if seats else (404, {"error": f"Unknown course '{parts[1]}'."})
+            return 200, seats
+        if parts == ["registrations"] and method == "GET":
+            return 200, self._state.committed
+        if parts in (["whatif"], ["registrations"]):
+            if method != "POST":
+                return 405, {"error": "Use POST."}
+            try:
+                registration = registration_from_dict(json.loads(body or b"null"))
+            except (json.JSONDecodeError, ValueError) as e:
+                return 400, {"error": str(e)}
+            if parts == ["whatif"]:
+                return 200, self._state.what_if(registration)
+            try:
+                return 200, self._state.commit(registration)
+            except ValueError as e:
+                return 409, {"error": str(e)}
+        return 404, {"error": f"No route for {method} {path}."}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            status, payload = await self._read_and_route(reader)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            status, payload = 400, {"error": "Malformed request."}
+        except Exception as e:
+            # Any other failure still gets a response rather than a dropped connection
+            self._events.warning("request_failed", "Request failed: {error}", error=repr(e))
+            status, payload = 500, {"error": "Internal server error."}
+        try:
+            body = json.dumps(payload).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_and_route(self, reader: asyncio.StreamReader) -> Tuple[int, object]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise ValueError("Bad request line.")
+        method, path, _ = request_line
+        length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+        if length > MAX_BODY_BYTES:
+            return 413, {"error": "Request body too large."}
+        body = await reader.readexactly(length) if length else b""
+        return self.route(method.upper(), path, body)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        """Serves until cancelled."""
+        server = await asyncio.start_server(self._handle, host, port)
+        self._events.info("service_started", "What-if service listening on http://{host}:{port}", host=host, port=port)
+        async with server:
+            await server.serve_forever()
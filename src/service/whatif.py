@@ -0,0 +1,158 @@
+import time
+from dataclasses import replace
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from src.allocator.compiled import CompiledInstance, UNASSIGNED
+from src.allocator.models import Course, Registration, DUMMY_COURSE_CODE
+from src.allocator.snapshot import AllocationSnapshot, OccupantBlock
+from src.allocator.ttc import IndexedTTC
+from src.utils.events import EventLog, OFF
+from src.utils.helpers import extract_course_code, is_no_course
+
+# Most add requests one registration may make, so a single query cannot create unbounded occupants.
+MAX_ADD_REQUESTS = 20
+
+def _string_list(data: dict, field: str) -> List[str]:
+    """The field as a list of strings, or an empty list if it is absent."""
+    values = data.get(field)
+    if values is None:
+        return []
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise ValueError(f"'{field}' must be a list of course codes.")
+    return values
+
+def _course_codes(values: List[str]) -> Tuple[str, ...]:
+    """Normalizes course cells the way the registration parser does, dropping "no course" values."""
+    codes = [extract_course_code(v) for v in values]
+    return tuple(c for c in codes if not is_no_course(c))
+
+def registration_from_dict(data: dict) -> Registration:
+    """
+    Builds a Registration from a JSON object of the form
+    {"student_id": ..., "add_requests": n, "add_preferences": [...],
+     "drops": [{"course": ..., "replacements": [...]}, ...]}.
+    Raises ValueError if the object is malformed.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("A registration must be a JSON object.")
+    student_id = data.get("student_id")
+    if isinstance(student_id, bool) or not isinstance(student_id, (str, int)) or not str(student_id).strip():
+        raise ValueError("A registration needs a 'student_id'.")
+    add_requests = data.get("add_requests", 0)
+    if isinstance(add_requests, bool) or not isinstance(add_requests, int) or not 0 <= add_requests <= MAX_ADD_REQUESTS:
+        raise ValueError(f"'add_requests' must be an integer from 0 to {MAX_ADD_REQUESTS}.")
+    raw_drops = data.get("drops")
+    if raw_drops is None:
+        raw_drops = []
+    if not isinstance(raw_drops, list):
+        raise ValueError("'drops' must be a list.")
+    drops = []
+    for drop in raw_drops:
+        if not isinstance(drop, dict) or not isinstance(drop.get("course"), str):
+            raise ValueError("Each drop must be an object with a 'course' code and a 'replacements' list.")
+        course = _course_codes([drop["course"]])
+        replacements = _course_codes(_string_list(drop, "replacements"))
+        if course:
+            drops.append((course[0], replacements))
+    return Registration(
+        student_id=str(student_id).strip(),
+        add_requests=add_requests,
+        add_preferences=_course_codes(_string_list(data, "add_preferences")),
+        drop_requests=tuple(drops),
+    )
+
+class WhatIfState:
+    """
+    Seat state kept in memory between queries.
+
+    Starts from the snapshot of a finished allocation. A what-if query allocates one
+    student's registration as a late row against the current seats, on a copy of them;
+    committing a registration does the same and keeps the result, so later queries see
+    the seats it took. Neither re-parses the spreadsheets. Each student can commit once.
+
+    snapshot() returns the starting snapshot with the committed registrations added, so a
+    later --resume round can continue from it. With `snapshot_path`, it is saved there
+    after every commit.
+    """
+    def __init__(self, snapshot: AllocationSnapshot, events: EventLog | None = None, snapshot_path: str | None = None):
+        self._events = events if events is not None else EventLog()
+        self._previous = snapshot
+        self._snapshot_path = snapshot_path
+        self._courses: Dict[str, Course] = snapshot.courses()
+        # Allocated occupants and unconditional drops of the committed registrations
+        self._blocks: List[OccupantBlock] = []
+        self._drops: List[Tuple[str, str]] = []
+        self._committed_students: Set[str] = set()
+        # Responses of commit(), in the order registrations were committed
+        self.committed: List[dict] = []
+
+    def seats(self, code: str | None = None) -> List[dict]:
+        """Capacity, seats held and free seats of one course, or of every course."""
+        codes = [extract_course_code(code)] if code is not None else list(self._courses)
+        return [
+            {"course": c, "capacity": course.capacity, "seats_held": course.seats_held,
+             "free": max(course.capacity - course.seats_held, 0)}
+            for c in codes if c != DUMMY_COURSE_CODE and (course := self._courses.get(c)) is not None
+        ]
+
+    def _allocate(self, registration: Registration,
+                  courses: Dict[str, Course]) -> Tuple[List[dict], CompiledInstance, List[Tuple[str, str]]]:
+        """
+        Allocates one registration against `courses`, updating them. Returns its result rows,
+        the allocated instance and the unconditional drops that were applied.
+        """
+        rows, drops = [], []
+        for dropped in registration.get_unconditional_drops():
+            if dropped in courses:
+                courses[dropped].capacity += 1
+                drops.append((registration.student_id, dropped))
+                rows.append({"dropped": dropped, "replacement": ""})
+
+        instance = CompiledInstance.build(courses, [registration])
+        IndexedTTC(instance, EventLog(console_level=OFF)).run()
+        instance.write_back(courses)
+        rows.extend({"dropped": dropped, "replacement": replacement} for _, dropped, replacement in instance.changed_rows())
+        return rows, instance, drops
+
+    def what_if(self, registration: Registration) -> dict:
+        """What the registration would get if submitted now; the seat state is left unchanged."""
+        start = time.perf_counter()
+        courses = {code: replace(course) for code, course in self._courses.items()}
+        rows, _, _ = self._allocate(registration, courses)
+        return {"student_id": registration.student_id, "results": rows,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    def commit(self, registration: Registration) -> dict:
+        """
+        Allocates the registration against the live seats and keeps the outcome. Raises
+        ValueError if the student has already committed a registration.
+        """
+        student = registration.student_id.strip().upper()
+        if student in self._committed_students:
+            raise ValueError(f"Student '{registration.student_id}' already has a committed registration.")
+        start = time.perf_counter()
+        rows, instance, drops = self._allocate(registration, self._courses)
+        final = np.where(instance.final_course == UNASSIGNED, instance.occ_original, instance.final_course)
+        self._blocks.append((instance.course_codes, instance.student_ids, instance.occ_student, instance.occ_original, final))
+        self._drops.extend(drops)
+        self._committed_students.add(student)
+
+        response = {"student_id": registration.student_id, "results": rows,
+                    "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+        self.committed.append(response)
+        self._events.info("registration_committed", "Committed registration of {student_id}: {results}",
+                          student_id=registration.student_id, results=rows)
+        if self._snapshot_path:
+            self.save_snapshot()
+        return response
+
+    def snapshot(self) -> AllocationSnapshot:
+        """The starting snapshot with every committed registration's occupants and drops added."""
+        return AllocationSnapshot.from_state(self._courses, [self._previous.occupant_block()] + self._blocks,
+                                             self._previous.unconditional_drops() + self._drops)
+
+    def save_snapshot(self):
+        """Writes snapshot() to `snapshot_path`."""
+        self.snapshot().save(self._snapshot_path)
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any, Tuple
+
+# Bumped whenever the parsers change what they produce, so stale entries are never used.
+PARSER_VERSION = 2
+
+DEFAULT_CACHE_DIR = "data/cache"
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+_SUFFIX = ".pkl"
+
+
+class ParseCache:
+    """
+    Directory of parsed inputs, stored as pickles and keyed by the content hash of the
+    input file, what was parsed from it and PARSER_VERSION. Entries are replaced
+    atomically, and the least recently used ones are evicted once the directory holds
+    more than `max_bytes`. Only load caches you created yourself, since they are pickles.
+    """
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, file_path: str, kind: str) -> str:
+        """Key of `kind` parsed from the file's current content."""
+        digest = hashlib.sha256(f"{PARSER_VERSION}\0{kind}\0".encode("utf-8"))
+        with open(file_path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def lookup(self, file_path: str, kind: str) -> Tuple[str | None, Any | None]:
+        """
+        The key and cached value of `kind` parsed from the file. Both are None if the file
+        does not exist, leaving the error to whoever loads it.
+        """
+        if not os.path.isfile(file_path):
+            return None, None
+        key = self.key(file_path, kind)
+        return key, self.get(key)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str) -> Any | None:
+        """The cached value, or None if there is no usable entry."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A truncated or unreadable entry is dropped and rebuilt
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process after it was read; the value is still good
+            pass
+        return value
+
+    def put(self, key: str, value: Any):
+        """Stores the value, then evicts old entries if the cache is over its size limit."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def add_cache_args(parser):
+    """Adds the shared parse cache options to a script's argument parser."""
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory for parsed inputs, reused while the input files are unchanged.")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // 2**20,
+                        help="Evict the least recently used parsed inputs above this size.")
+    parser.add_argument("--no-cache", action="store_true", help="Always load and parse the input files.")
+
+def cache_from_args(args) -> ParseCache | None:
+    """Builds the ParseCache described by the options from add_cache_args, or None with --no-cache."""
+    if args.no_cache:
+        return None
+    return ParseCache(args.cache_dir, max_bytes=args.cache_size_mb * 2**20)
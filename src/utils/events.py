@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from typing import Dict, List
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+# Above every level; used to silence a destination entirely.
+OFF = 100
+
+LEVELS: Dict[str, int] = {"debug": DEBUG, "info": INFO, "warning": WARNING, "off": OFF}
+_LEVEL_NAMES = {level: name for name, level in LEVELS.items()}
+
+
+class JsonLinesSink:
+    """
+    Buffers event records in memory and appends them to a JSON lines file in batches,
+    so hot-path events cost a dict append rather than a write each.
+    """
+    def __init__(self, file_path: str, batch_size: int = 10_000):
+        self.file_path = file_path
+        self._batch_size = batch_size
+        self._buffer: List[dict] = []
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self._file = open(file_path, "w", encoding="utf-8")
+
+    def write(self, record: dict):
+        self._buffer.append(record)
+        if len(self._buffer) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("".join(json.dumps(r) + "\n" for r in self._buffer))
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class EventLog:
+    """
+    Leveled, structured events for the allocation run.
+
+    Each event has a level, a name and keyword fields. The console gets the formatted
+    message for events at or above `console_level`; the optional sink gets the full
+    record for events at or above `sink_level`. Callers on hot paths should check
+    `enabled(level)` first, so nothing is built when no destination wants the event.
+    """
+    def __init__(self, console_level: int = INFO, sink: JsonLinesSink | None = None, sink_level: int = DEBUG):
+        self._console_level = console_level
+        self._sink = sink
+        self._sink_level = sink_level if sink is not None else OFF
+        self._min_level = min(self._console_level, self._sink_level)
+
+    @classmethod
+    def quiet(cls) -> "EventLog":
+        """An event log that only prints warnings and keeps no records."""
+        return cls(console_level=WARNING)
+
+    def enabled(self, level: int) -> bool:
+        return level >= self._min_level
+
+    def emit(self, level: int, event: str, message: str = "", **fields):
+        """
+        Records an event. `message` is a str.format template over `fields` and is only
+        formatted when the event is printed.
+        """
+        if level < self._min_level:
+            return
+        if level >= self._console_level and message:
+            print(message.format(**fields))
+        if level >= self._sink_level:
+            self._sink.write({"ts": time.time(), "level": _LEVEL_NAMES[level], "event": event, **fields})
+
+    def debug(self, event: str, message: str = "", **fields):
+        self.emit(DEBUG, event, message, **fields)
+
+    def info(self, event: str, message: str = "", **fields):
+        self.emit(INFO, event, message, **fields)
+
+    def warning(self, event: str, message: str = "", **fields):
+        self.emit(WARNING, event, message, **fields)
+
+    def close(self):
+        """Flushes any buffered records to the sink."""
+        if self._sink is not None:
+            self._sink.close()
+
+
+def add_event_args(parser):
+    """Adds the shared logging options to a script's argument parser."""
+    parser.add_argument("--log-level", choices=[n for n in LEVELS if n != "off"], default="info",
+                        help="Lowest level printed to the console; 'debug' prints every assignment.")
+    parser.add_argument("--quiet", action="store_true", help="Only print warnings to the console.")
+    parser.add_argument("--event-log", default=None,
+                        help="Write every event, including per-assignment records, to this JSON lines file.")
+
+def event_log_from_args(args) -> EventLog:
+    """Builds the EventLog described by the options from add_event_args."""
+    console_level = WARNING if args.quiet else LEVELS[args.log_level]
+    sink = JsonLinesSink(args.event_log) if args.event_log else None
+    return EventLog(console_level=console_level, sink=sink)
@@ -1,11 +1,132 @@
 import pandas as pd
 import os
+from typing import Callable, Dict, List
 
-def load_dataframe(file_path: str) -> pd.DataFrame | None:
-    """Loads an Excel file into a pandas DataFrame."""
+from .cache import ParseCache
+
+# Formats are picked by file extension. Parquet and Feather need the optional pyarrow package.
+SUPPORTED_EXTENSIONS = (".xlsx", ".xls", ".csv", ".parquet", ".feather")
+
+def _extension(file_path: str) -> str:
+    return os.path.splitext(file_path)[1].lower()
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet and Feather files require the 'pyarrow' package (pip install pyarrow).")
+
+def _arrow_columns(schema_names: List[str], usecols: List[int] | None) -> List[str] | None:
+    """Maps column positions to names for the Arrow-based formats, which select by name."""
+    if usecols is None:
+        return None
+    return [schema_names[i] for i in usecols if i < len(schema_names)]
+
+def _read_excel(file_path: str, usecols: List[int] | None) -> pd.DataFrame:
+    return pd.read_excel(file_path, usecols=usecols)
+
+def _read_csv(file_path: str, usecols: List[int] | None) -> pd.DataFrame:
+    # Cells stay as entered, so IDs such as 00123 keep their zeros; only empty cells become NaN
+    return pd.read_csv(file_path, usecols=usecols, dtype=str, keep_default_na=False, na_values=[""])
+
+def _read_parquet(file_path: str, usecols: List[int] | None) -> pd.DataFrame:
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+    columns = _arrow_columns(pq.read_schema(file_path).names, usecols)
+    return pq.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+
+def _read_feather(file_path: str, usecols: List[int] | None) -> pd.DataFrame:
+    _require_pyarrow()
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    with ipc.open_file(file_path) as reader:
+        names = reader.schema.names
+    # Uncompressed Feather files are memory-mapped instead of copied into memory
+    return feather.read_table(file_path, columns=_arrow_columns(names, usecols), memory_map=True).to_pandas()
+
+def _write_excel(df: pd.DataFrame, file_path: str, index: bool):
+    """Streams rows into a write-only workbook instead of building the whole sheet in memory."""
+    from openpyxl import Workbook
+
+    if index:
+        df = df.reset_index()
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([str(c) for c in df.columns])
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        sheet.append(row)
+    workbook.save(file_path)
+
+def _arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """Stores mixed-type object columns (common in Excel exports) as strings, keeping blanks as nulls."""
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].map(str, na_action='ignore').astype(object)
+    return df
+
+def _write_csv(df: pd.DataFrame, file_path: str, index: bool):
+    df.to_csv(file_path, index=index)
+
+def _write_parquet(df: pd.DataFrame, file_path: str, index: bool):
+    _require_pyarrow()
+    _arrow_safe(df).to_parquet(file_path, index=index)
+
+def _write_feather(df: pd.DataFrame, file_path: str, index: bool):
+    _require_pyarrow()
+    # Feather has no index; store it as a regular column when requested
+    _arrow_safe(df.reset_index() if index else df.reset_index(drop=True)).to_feather(file_path, compression="uncompressed")
+
+_READERS: Dict[str, Callable[[str, List[int] | None], pd.DataFrame]] = {
+    ".xlsx": _read_excel,
+    ".xls": _read_excel,
+    ".csv": _read_csv,
+    ".parquet": _read_parquet,
+    ".feather": _read_feather,
+}
+
+_WRITERS: Dict[str, Callable[[pd.DataFrame, str, bool], None]] = {
+    ".xlsx": _write_excel,
+    ".csv": _write_csv,
+    ".parquet": _write_parquet,
+    ".feather": _write_feather,
+}
+
+def _pad_to_positions(df: pd.DataFrame, usecols: List[int]) -> pd.DataFrame:
+    """
+    Re-inserts empty placeholder columns for positions that were not read, so code that
+    addresses columns by position sees the same layout as the full file.
+    """
+    columns = dict(zip(sorted(usecols), df.columns))
+    padded = {}
+    for i in range(max(usecols) + 1):
+        if i in columns:
+            padded[columns[i]] = df[columns[i]]
+        else:
+            padded[f"_unused_{i}"] = pd.Series(None, index=df.index, dtype=object)
+    return pd.DataFrame(padded, index=df.index)
+
+def load_dataframe(file_path: str, usecols: List[int] | None = None, cache: ParseCache | None = None) -> pd.DataFrame | None:
+    """
+    Loads an Excel, CSV, Parquet or Feather file into a pandas DataFrame.
+    If `usecols` is given, only those column positions are read; the others are left as
+    empty placeholders so positional lookups still line up. With a cache, a file whose
+    content was loaded before with the same columns is not decoded again.
+    """
     try:
         print(f"Loading data from '{file_path}'...")
-        df = pd.read_excel(file_path)
+        reader = _READERS.get(_extension(file_path))
+        if reader is None:
+            print(f"Error: Unsupported file format for '{file_path}'. Expected one of {SUPPORTED_EXTENSIONS}.")
+            return None
+        key, df = cache.lookup(file_path, f"frame:{usecols}") if cache is not None else (None, None)
+        if df is not None:
+            print(f"Successfully loaded {len(df)} rows from the cache.")
+            return df
+        df = reader(file_path, usecols)
+        if usecols is not None:
+            df = _pad_to_positions(df, usecols)
+        if key is not None:
+            cache.put(key, df)
         print(f"Successfully loaded {len(df)} rows.")
         return df
     except FileNotFoundError:
@@ -16,10 +137,14 @@ def load_dataframe(file_path: str) -> pd.DataFrame | None:
         return None
 
 def save_dataframe(df: pd.DataFrame, file_path: str, index: bool = False):
-    """Saves a pandas DataFrame to an Excel file."""
+    """Saves a pandas DataFrame to an Excel, CSV, Parquet or Feather file, chosen by extension."""
     try:
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        df.to_excel(file_path, index=index)
+        writer = _WRITERS.get(_extension(file_path))
+        if writer is None:
+            print(f"Error: Unsupported output format for '{file_path}'. Expected one of {tuple(_WRITERS)}.")
+            return
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        writer(df, file_path, index)
         print(f"Data successfully saved to '{file_path}'.")
     except Exception as e:
-        print(f"Error writing to '{file_path}': {e}")
\ No newline at end of file
+        print(f"Error writing to '{file_path}': {e}")
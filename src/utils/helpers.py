@@ -1,5 +1,25 @@
+import numpy as np
 import pandas as pd
 
+# Values that represent "no course" once a cell has been through extract_course_code.
+NO_COURSE_VALUES = ['N/A', 'N/A N', '']
+
+# Positional layout of the registration sheet.
+STUDENT_ID_COL = 2
+NUM_ADDS_COL = 5
+ADD_PREF_COLS = list(range(6, 10))
+# Each drop slot is a course to drop followed by three replacement preferences.
+DROP_SLOT_COLS = [(10 + i * 4, list(range(11 + i * 4, 14 + i * 4))) for i in range(3)]
+
+# Column positions the parsers read, for loading only what is needed.
+SEATS_USECOLS = [0, 1]
+REGISTRATION_USECOLS = [STUDENT_ID_COL, NUM_ADDS_COL] + ADD_PREF_COLS + [c for drop_col, repl_cols in DROP_SLOT_COLS for c in [drop_col] + repl_cols]
+
+# Column names of the frame returned by normalize_registrations.
+ADD_COLUMNS = [f"add_{i + 1}" for i in range(len(ADD_PREF_COLS))]
+DROP_COLUMNS = [f"drop_{i + 1}" for i in range(len(DROP_SLOT_COLS))]
+REPL_COLUMNS = [[f"repl_{i + 1}_{j + 1}" for j in range(len(repl_cols))] for i, (_, repl_cols) in enumerate(DROP_SLOT_COLS)]
+
 def extract_course_code(val: any) -> str:
     """
     Extracts the first five characters of the course code in uppercase.
@@ -15,4 +35,36 @@ def is_no_course(val: str) -> bool:
     Returns True if the value represents "no course".
     Unifies various forms like "N/A", "N/A N", and empty strings.
     """
-    return val in ['N/A', 'N/A N', '']
\ No newline at end of file
+    return val in NO_COURSE_VALUES
+
+def extract_course_codes(block: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized extract_course_code over a block of columns.
+    Returns a frame of the same shape with 'N/A' for blank or NaN cells.
+    """
+    codes = block.astype(str).apply(lambda col: col.str.strip().str.upper().str[:5]).astype(object)
+    return codes.mask(block.isna() | (codes == ''), 'N/A')
+
+def to_int_column(col: pd.Series) -> pd.Series:
+    """Converts a column to ints, using 0 for values that are not numbers."""
+    nums = pd.to_numeric(col, errors='coerce')
+    return nums.where(np.isfinite(nums), 0).astype(np.int64)
+
+def normalize_registrations(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes the registration sheet in bulk into named columns: student_id,
+    add_requests, add_1..add_4, and drop_k with repl_k_1..repl_k_3 for each drop slot.
+    Course cells hold extracted codes, with every "no course" value turned into ''.
+    """
+    course_cols = ADD_PREF_COLS + [c for drop_col, repl_cols in DROP_SLOT_COLS for c in [drop_col] + repl_cols]
+    course_names = ADD_COLUMNS + [c for drop_name, repl_names in zip(DROP_COLUMNS, REPL_COLUMNS) for c in [drop_name] + repl_names]
+
+    codes = extract_course_codes(df.iloc[:, course_cols])
+    codes = codes.mask(codes.isin(NO_COURSE_VALUES), '')
+    codes.columns = course_names
+
+    table = pd.DataFrame({
+        "student_id": df.iloc[:, STUDENT_ID_COL].map(str).astype(object),
+        "add_requests": to_int_column(df.iloc[:, NUM_ADDS_COL]),
+    }, index=df.index)
+    return pd.concat([table, codes], axis=1).reset_index(drop=True)
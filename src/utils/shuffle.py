@@ -0,0 +1,146 @@
+import json
+import math
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from .file_io import _extension, _require_pyarrow
+
+# Formats the external shuffle can stream, in and out.
+STREAMING_EXTENSIONS = (".csv", ".parquet")
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+def new_seed() -> int:
+    """A fresh random seed, to be recorded so the shuffle can be replayed. It also fits pandas' sample()."""
+    return int(np.random.SeedSequence().entropy % 2**32)
+
+def _check_streaming(file_path: str):
+    if _extension(file_path) not in STREAMING_EXTENSIONS:
+        raise ValueError(f"The external shuffle reads and writes {STREAMING_EXTENSIONS} files, not '{file_path}'.")
+
+def _read_chunks(file_path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Streams the file in chunks of at most chunk_rows rows. CSV cells are kept as the
+    original text, so the output has the same values regardless of chunk boundaries.
+    """
+    if _extension(file_path) == ".csv":
+        yield from pd.read_csv(file_path, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+        return
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+def _count_rows(file_path: str, chunk_rows: int) -> int:
+    if _extension(file_path) == ".parquet":
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(file_path).metadata.num_rows
+    return sum(len(chunk) for chunk in pd.read_csv(file_path, chunksize=chunk_rows, usecols=[0], dtype=str))
+
+def _source_schema(file_path: str):
+    """
+    Arrow schema of the input: the Parquet file's own, or all string columns for a CSV,
+    whose cells are read as text. Every output chunk is written with it, so the column
+    types never depend on which rows a chunk happens to hold.
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if _extension(file_path) == ".parquet":
+        return pq.ParquetFile(file_path).schema_arrow
+    columns = pd.read_csv(file_path, nrows=0).columns
+    return pa.schema([(str(name), pa.string()) for name in columns])
+
+class _ChunkWriter:
+    """Appends DataFrame chunks to a CSV or Parquet file; Parquet chunks are written with `schema`."""
+    def __init__(self, file_path: str, schema=None):
+        self._path = file_path
+        self._parquet = _extension(file_path) == ".parquet"
+        self._schema = schema
+        self._writer = None
+        self._started = False
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+    def write(self, df: pd.DataFrame):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self._path, self._schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self._path, mode="a" if self._started else "w", header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def external_shuffle(input_path: str, output_path: str, seed: int, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                     tmp_dir: str | None = None) -> dict:
+    """
+    Shuffles the rows of a CSV or Parquet file without loading it whole, holding about
+    chunk_rows rows in memory at a time.
+
+    Each row is scattered to one of ceil(rows / chunk_rows) temporary buckets chosen
+    uniformly at random; the buckets are then shuffled one at a time and written out in
+    order, which gives a uniformly random permutation. The same seed and chunk_rows
+    reproduce the same output. Returns the shuffle record as a dict; pass it to
+    save_shuffle_record to keep it next to the output.
+    """
+    _check_streaming(input_path)
+    _check_streaming(output_path)
+    rng = np.random.default_rng(seed)
+    rows = _count_rows(input_path, chunk_rows)
+    if rows == 0:
+        raise ValueError(f"'{input_path}' has no rows to shuffle.")
+    n_buckets = max(1, math.ceil(rows / chunk_rows))
+
+    work_dir = tempfile.mkdtemp(prefix="shuffle_", dir=tmp_dir)
+    try:
+        bucket_paths = [os.path.join(work_dir, f"bucket_{b}.pkl") for b in range(n_buckets)]
+        for chunk in _read_chunks(input_path, chunk_rows):
+            buckets = rng.integers(n_buckets, size=len(chunk))
+            for b in np.unique(buckets).tolist():
+                with open(bucket_paths[b], "ab") as f:
+                    pickle.dump(chunk[buckets == b], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        schema = _source_schema(input_path) if _extension(output_path) == ".parquet" else None
+        writer = _ChunkWriter(output_path, schema)
+        try:
+            for path in bucket_paths:
+                if not os.path.exists(path):
+                    continue
+                pieces = []
+                with open(path, "rb") as f:
+                    while True:
+                        try:
+                            pieces.append(pickle.load(f))
+                        except EOFError:
+                            break
+                bucket = pd.concat(pieces, ignore_index=True)
+                writer.write(bucket.iloc[rng.permutation(len(bucket))])
+                os.remove(path)
+        finally:
+            writer.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {"method": "external", "seed": seed, "chunk_rows": chunk_rows, "rows": rows, "input": input_path}
+
+def shuffle_record_path(output_path: str) -> str:
+    """Where the shuffle record of an output file is kept."""
+    return output_path + ".shuffle.json"
+
+def save_shuffle_record(output_path: str, record: dict):
+    """Writes the seed and settings of a shuffle next to its output, for replaying it exactly."""
+    with open(shuffle_record_path(output_path), "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
@@ -0,0 +1,254 @@
+import numpy as np
+import pandas as pd
+from typing import List
+
+from src.allocator.compiled import CompiledInstance, UNASSIGNED
+from src.allocator.processor import AddDropProcessor
+from src.utils.events import EventLog, WARNING
+
+# Passes of degree-zero trimming run before the SCC search; each pass is one vectorized sweep.
+TRIM_PASSES = 3
+
+class OptimalityChecker:
+    """
+    Certifies that an allocation is Pareto-efficient for the occupants TTC was run on.
+
+    Occupant i strictly prefers course c if c comes before its final course in i's
+    preferences (all of them when the final course is not listed), c is not the dummy
+    course, and no other occupant of the same student ends with c, matching how the
+    allocator prunes a course from a student's other occupants. A counterexample is
+    either a free-seat improvement (i prefers a course that ended with a free seat) or
+    an improving cycle: occupants i1..ik where each prefers the course the next one
+    ends with, so trading along the cycle makes all of them better off.
+
+    Courses and occupants form a graph with an edge from each occupant to every course
+    it prefers and from each course to every occupant ending with it; improving cycles
+    are exactly the cycles of that graph, found with one strongly connected components
+    pass, so checking takes time linear in occupants times preferences.
+    """
+    def __init__(self, instance: CompiledInstance, final_course: np.ndarray | None = None,
+                 seats_held: np.ndarray | None = None):
+        """
+        `final_course` defaults to the instance's own. Without `seats_held`, the instance's
+        seats are taken as the state before TTC and the moves are applied to them.
+        """
+        self._inst = instance
+        final = instance.final_course if final_course is None else final_course
+        self._final = np.where(final == UNASSIGNED, instance.occ_original, final).astype(np.int64)
+        if seats_held is None:
+            seats_held = (instance.seats_held + np.bincount(self._final, minlength=instance.n_courses)
+                          - np.bincount(instance.occ_original, minlength=instance.n_courses))
+        self._seats_held = seats_held
+        self.free_seat_improvements = pd.DataFrame(columns=["Student ID", "Occupant", "Final Course", "Preferred Course"])
+        self.improving_cycles: List[pd.DataFrame] = []
+
+    @classmethod
+    def from_processor(cls, processor: AddDropProcessor) -> "OptimalityChecker":
+        """Checker for a processor that has run with the indexed engine."""
+        instance = processor.compiled
+        if instance is None:
+            raise ValueError("The optimality check needs a processor run with the 'indexed' engine.")
+        return cls(instance, seats_held=instance.seats_held)
+
+    @classmethod
+    def from_result(cls, courses_df: pd.DataFrame, registrations_df: pd.DataFrame, result_df: pd.DataFrame) -> "OptimalityChecker":
+        """
+        Rebuilds the occupants from the seat and registration data the way the allocator
+        does, and reads each occupant's final course from the result rows.
+        """
+        processor = AddDropProcessor(courses_df, registrations_df, events=EventLog(console_level=WARNING))
+        instance = processor.compile()
+        return cls(instance, final_courses_from_result(instance, result_df))
+
+    def _preferred_entries(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (occupant, course) for every course an occupant strictly prefers to its final one."""
+        inst = self._inst
+        n = inst.n_occupants
+        lengths = np.diff(inst.pref_offsets)
+        owner = np.repeat(np.arange(n), lengths)
+        courses = inst.pref_courses.astype(np.int64)
+
+        # Rank of the final course in each occupant's list; unlisted finals rank after every entry
+        hits = np.flatnonzero(courses == self._final[owner])
+        first_owner, first = np.unique(owner[hits], return_index=True)
+        final_rank = inst.pref_offsets[1:].copy()
+        final_rank[first_owner] = hits[first]
+        preferred = (np.arange(len(courses)) < final_rank[owner]) & (courses != inst.dummy)
+
+        # A course the student already ends with through another occupant is not an improvement
+        student_course = inst.occ_student.astype(np.int64) * inst.n_courses
+        held = np.isin(student_course[owner] + courses, student_course + self._final)
+        preferred &= ~held
+        return owner[preferred], courses[preferred]
+
+    def check(self) -> bool:
+        """Looks for counterexamples. Returns True if there are none."""
+        inst = self._inst
+        occupants, courses = self._preferred_entries()
+
+        free = self._seats_held[courses] < inst.capacity[courses]
+        codes = np.asarray(inst.course_codes, dtype=object)
+        students = np.asarray(inst.student_ids, dtype=object)
+        self.free_seat_improvements = pd.DataFrame({
+            "Student ID": students[inst.occ_student[occupants[free]]],
+            "Occupant": occupants[free],
+            "Final Course": codes[self._final[occupants[free]]],
+            "Preferred Course": codes[courses[free]],
+        })
+
+        # Nodes are occupants 0..n-1 followed by courses; the dummy course is never traded
+        n = inst.n_occupants
+        holders = np.flatnonzero(self._final != inst.dummy)
+        source = np.concatenate([occupants, n + self._final[holders]])
+        target = np.concatenate([n + courses, holders])
+        cycles = _find_cycles(source, target, n + inst.n_courses)
+
+        self.improving_cycles = []
+        for cycle in cycles:
+            members = np.asarray(cycle[0::2], dtype=np.int64)
+            wanted = np.asarray(cycle[1::2], dtype=np.int64) - n
+            self.improving_cycles.append(pd.DataFrame({
+                "Student ID": students[inst.occ_student[members]],
+                "Occupant": members,
+                "Final Course": codes[self._final[members]],
+                "Preferred Course": codes[wanted],
+            }))
+        return self.free_seat_improvements.empty and not self.improving_cycles
+
+    def report(self):
+        """Prints the counterexamples found by check()."""
+        if self.free_seat_improvements.empty and not self.improving_cycles:
+            print("\nOptimality check passed: no free-seat improvements and no improving cycles.")
+            return
+        if not self.free_seat_improvements.empty:
+            print(f"\nFound {len(self.free_seat_improvements)} free-seat improvements:")
+            for row in self.free_seat_improvements.itertuples(index=False):
+                print(f"  - Student {row[0]} (OccID {row[1]}) ends with {row[2]} but {row[3]} has a free seat.")
+        if self.improving_cycles:
+            print(f"\nFound {len(self.improving_cycles)} improving cycles:")
+            for cycle in self.improving_cycles:
+                steps = ", ".join(f"{s} gives {f} for {p}" for s, f, p in zip(cycle["Student ID"], cycle["Final Course"], cycle["Preferred Course"]))
+                print(f"  - {steps}")
+
+def final_courses_from_result(instance: CompiledInstance, result_df: pd.DataFrame) -> np.ndarray:
+    """
+    Maps result rows back onto occupants: a swap row to an occupant of that student
+    dropping that course, an add row to one of the student's add occupants. When a
+    student has several such occupants, each row goes to one whose preferences list the
+    new course, rows with the fewest candidates first. Unconditional drop rows are
+    skipped; occupants without a row keep their original course.
+    """
+    codes = {code: i for i, code in enumerate(instance.course_codes)}
+    students = {sid: i for i, sid in enumerate(instance.student_ids)}
+    result = result_df.reindex(columns=["Student ID", "Dropped Course", "Replacement Course"])
+    result = result.astype(object).fillna("").astype(str)
+    result = result[result["Replacement Course"] != ""]
+
+    rows = pd.DataFrame({
+        "student": result["Student ID"].map(students),
+        "original": result["Dropped Course"].map(lambda c: codes.get(c, -1) if c else instance.dummy),
+        "final": result["Replacement Course"].map(lambda c: codes.get(c, -1)),
+    }).dropna().astype(np.int64)
+    rows["row"] = np.arange(len(rows))
+    occupants = pd.DataFrame({"student": instance.occ_student.astype(np.int64), "original": instance.occ_original.astype(np.int64),
+                              "occupant": np.arange(instance.n_occupants)})
+    candidates = rows.merge(occupants, on=["student", "original"])
+
+    owner = np.repeat(np.arange(instance.n_occupants, dtype=np.int64), np.diff(instance.pref_offsets))
+    listed = owner * instance.n_courses + instance.pref_courses
+    candidates = candidates[np.isin(candidates["occupant"].to_numpy() * instance.n_courses + candidates["final"].to_numpy(), listed)]
+    candidates = candidates.assign(options=candidates.groupby("row")["occupant"].transform("size"))
+    candidates = candidates.sort_values(["options", "row", "occupant"], kind="stable")
+
+    final = np.full(instance.n_occupants, UNASSIGNED, dtype=np.int64)
+    matched_rows = set()
+    for row, occupant, course in candidates[["row", "occupant", "final"]].itertuples(index=False):
+        if row not in matched_rows and final[occupant] == UNASSIGNED:
+            final[occupant] = course
+            matched_rows.add(row)
+    return final
+
+def _find_cycles(source: np.ndarray, target: np.ndarray, n_nodes: int) -> List[List[int]]:
+    """
+    Returns one cycle from each strongly connected component with more than one node.
+    Nodes without incoming or outgoing edges are trimmed first with vectorized passes,
+    then an iterative Tarjan search runs on what is left.
+    """
+    alive = np.ones(n_nodes, dtype=bool)
+    for _ in range(TRIM_PASSES):
+        keep = alive[source] & alive[target]
+        source, target = source[keep], target[keep]
+        trimmed = alive & (np.bincount(source, minlength=n_nodes) > 0) & (np.bincount(target, minlength=n_nodes) > 0)
+        if trimmed.sum() == alive.sum():
+            break
+        alive = trimmed
+    keep = alive[source] & alive[target]
+    source, target = source[keep], target[keep]
+    if len(source) == 0:
+        return []
+
+    order = np.argsort(source, kind="stable")
+    offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=n_nodes), out=offsets[1:])
+    edges = target[order].tolist()
+    offsets = offsets.tolist()
+
+    index = {}
+    low = {}
+    on_stack = set()
+    stack: List[int] = []
+    components: List[List[int]] = []
+    for root in np.unique(source).tolist():
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, offsets[root])]
+        while work:
+            node, edge = work[-1]
+            if edge < offsets[node + 1]:
+                work[-1] = (node, edge + 1)
+                succ = edges[edge]
+                if succ not in index:
+                    index[succ] = low[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, offsets[succ]))
+                elif succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1:
+                    components.append(component)
+
+    return [_cycle_in(component, edges, offsets) for component in components]
+
+def _cycle_in(component: List[int], edges: List[int], offsets: List[int]) -> List[int]:
+    """Finds a cycle through the component's smallest node with a breadth-first search inside it."""
+    members = set(component)
+    start = min(component)
+    parent = {start: None}
+    queue = [start]
+    for node in queue:
+        for succ in edges[offsets[node]:offsets[node + 1]]:
+            if succ == start:
+                cycle = [node]
+                while parent[cycle[-1]] is not None:
+                    cycle.append(parent[cycle[-1]])
+                return cycle[::-1]
+            if succ in members and succ not in parent:
+                parent[succ] = node
+                queue.append(succ)
+    return []
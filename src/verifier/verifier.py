@@ -1,52 +1,79 @@
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Set
-from src.utils.helpers import extract_course_code
+from typing import Callable, List, Dict, Set, Tuple
+from src.utils.helpers import (
+    ADD_COLUMNS, DROP_COLUMNS, REPL_COLUMNS, extract_course_codes, normalize_registrations
+)
+
+# Columns of the structured violations table filled in by verify(full=True).
+VIOLATION_COLUMNS = ["Check", "Row", "Student ID", "Course", "Detail"]
+
+def registration_table(registration_df: pd.DataFrame) -> pd.DataFrame:
+    """The normalized registration table the verifier checks against, with canonical student IDs."""
+    table = normalize_registrations(registration_df)
+    table["student_id"] = table["student_id"].str.strip().str.upper().astype(object)
+    return table
 
 class ResultVerifier:
     """
     Verifies the output of the allocation algorithm against the original registration data.
+
+    With `seats_df`, verify(full=True) also checks course capacities and that every
+    unconditional drop was applied. A table built earlier by registration_table() can be
+    passed as `registrations`; `registration_df` is then not parsed.
     """
-    def __init__(self, registration_df: pd.DataFrame, result_df: pd.DataFrame):
+    def __init__(self, registration_df: pd.DataFrame | None, result_df: pd.DataFrame, seats_df: pd.DataFrame | None = None,
+                 registrations: pd.DataFrame | None = None):
         self._result_df = result_df
-        self._student_requests = self._parse_student_requests(registration_df)
+        self._seats_df = seats_df
+        self._registrations = registrations if registrations is not None else registration_table(registration_df)
+        # Built on first use by the row-by-row checks; the full mode does not need it
+        self._student_requests: Dict[str, Dict[str, Set]] | None = None
         self.discrepancies: List[str] = []
+        # One row per violation found by verify(full=True)
+        self.violations = pd.DataFrame(columns=VIOLATION_COLUMNS)
 
-    def _parse_student_requests(self, df: pd.DataFrame) -> Dict[str, Dict[str, Set]]:
+    def _parse_student_requests(self, table: pd.DataFrame) -> Dict[str, Dict[str, Set]]:
         """Parses registration data into a lookup structure for easy verification."""
-        reg_info = {}
-        for _, row in df.iterrows():
-            student_id = str(row.iloc[2]).strip().upper()
-            if student_id not in reg_info:
-                reg_info[student_id] = {"drops": set(), "adds": set()}
-
-            # Gather all possible courses a student might drop
-            for i in range(3):
-                drop_col = 10 + (i * 4)
-                course = extract_course_code(row.iloc[drop_col])
-                if course != 'N/A':
-                    reg_info[student_id]["drops"].add(course)
-            
-            # Gather all possible courses a student might be assigned
-            add_prefs = {extract_course_code(row.iloc[c]) for c in range(6, 10)}
-            repl_prefs1 = {extract_course_code(row.iloc[c]) for c in range(11, 14)}
-            repl_prefs2 = {extract_course_code(row.iloc[c]) for c in range(15, 18)}
-            repl_prefs3 = {extract_course_code(row.iloc[c]) for c in range(19, 22)}
-            
-            all_adds = add_prefs.union(repl_prefs1, repl_prefs2, repl_prefs3)
-            all_adds.discard('N/A')
-            reg_info[student_id]["adds"].update(all_adds)
 
-        return reg_info
+        def courses_by_student(columns: List[str]) -> Dict[str, Set[str]]:
+            # Gather the non-blank codes of the given columns per student
+            codes = table.melt(id_vars="student_id", value_vars=columns)
+            codes = codes[codes["value"] != ""]
+            return codes.groupby("student_id")["value"].agg(set).to_dict()
 
-    def verify(self) -> bool:
+        # Gather all possible courses a student might drop
+        drops = courses_by_student(DROP_COLUMNS)
+        # Gather all possible courses a student might be assigned
+        adds = courses_by_student(ADD_COLUMNS + [c for repl_cols in REPL_COLUMNS for c in repl_cols])
+
+        return {
+            student_id: {"drops": drops.get(student_id, set()), "adds": adds.get(student_id, set())}
+            for student_id in table["student_id"].unique()
+        }
+
+    def verify(self, full: bool = False) -> bool:
         """
         Runs all verification checks and populates the discrepancies list.
         Returns True if no discrepancies are found, otherwise False.
+
+        With full=True, runs the invariant checks of verify_invariants instead of the
+        row-by-row membership checks, and also fills the `violations` table.
         """
         if self._result_df is None:
             self.discrepancies.append("Result file could not be read. Verification aborted.")
             return False
 
+        if full:
+            self.violations = self.verify_invariants()
+            self.discrepancies.extend(
+                detail if pd.isna(row) else f"Row {row}: {detail}"
+                for row, detail in zip(self.violations["Row"], self.violations["Detail"])
+            )
+            return not self.discrepancies
+
+        if self._student_requests is None:
+            self._student_requests = self._parse_student_requests(self._registrations)
         for row_idx, row in self._result_df.iterrows():
             student_id = str(row.get("Student ID", "")).strip().upper()
             dropped = str(row.get("Dropped Course", "")).strip().upper()
@@ -76,11 +103,196 @@ class ResultVerifier:
 
         return not self.discrepancies
 
+    def _normalized_result(self) -> pd.DataFrame:
+        """The result's student and course columns stripped and upper-cased, with the sheet row of each."""
+        columns = {"Student ID": "student", "Dropped Course": "dropped", "Replacement Course": "added"}
+        result = self._result_df.reindex(columns=list(columns)).rename(columns=columns)
+        result = result.astype(object).fillna("").astype(str).apply(lambda col: col.str.strip().str.upper())
+        result = result.mask(result == "NAN", "").astype(object)
+        result.insert(0, "row", np.arange(len(result)) + 2)
+        return result[result["student"] != ""]
+
+    def _drop_slots(self) -> pd.DataFrame:
+        """Every requested drop as (student, dropped, conditional) plus its replacement columns."""
+        slots = pd.concat([
+            self._registrations[["student_id", drop_col] + repl_cols].set_axis(["student", "dropped", "r1", "r2", "r3"], axis=1)
+            for drop_col, repl_cols in zip(DROP_COLUMNS, REPL_COLUMNS)
+        ], ignore_index=True)
+        slots = slots[slots["dropped"] != ""]
+        slots["conditional"] = (slots[["r1", "r2", "r3"]] != "").any(axis=1)
+        return slots
+
+    def verify_invariants(self) -> pd.DataFrame:
+        """
+        Checks the whole result with joins and group-bys and returns one row per violation.
+
+        - Every row's student is registered and the row matches one of their requests: adds
+          come from the add preferences, swaps from the replacements listed for that drop,
+          and plain drops from drops without replacements.
+        - No student is assigned a course twice, gets more adds than requested, or drops a
+          course more often than requested.
+        - With seat data, every assigned course is in the seat file, no course ends with
+          more seats held than it allows, and every unconditional drop of a known course
+          appears in the result.
+        """
+        result = self._normalized_result()
+        reg = self._registrations
+        slots = self._drop_slots()
+        add_prefs = reg.melt(id_vars="student_id", value_vars=ADD_COLUMNS, value_name="added")
+        add_prefs = add_prefs[add_prefs["added"] != ""].rename(columns={"student_id": "student"})
+        found: List[pd.DataFrame] = []
+
+        # Students and courses are interned to ints so every join and group-by works on int64 keys
+        def intern(columns: List[Tuple[pd.DataFrame, str]]) -> Tuple[List[np.ndarray], int]:
+            ids, uniques = pd.factorize(np.concatenate([frame[column].to_numpy(dtype=object) for frame, column in columns]))
+            return np.split(ids.astype(np.int64), np.cumsum([len(frame) for frame, _ in columns])[:-1]), len(uniques)
+
+        (result_student, slot_student, pref_student), _ = intern([(result, "student"), (slots, "student"), (add_prefs, "student")])
+        (result_dropped, result_added, slot_dropped, *slot_repls, pref_added), n_courses = intern(
+            [(result, "dropped"), (result, "added"), (slots, "dropped"), (slots, "r1"), (slots, "r2"), (slots, "r3"), (add_prefs, "added")])
+        result = result.assign(student_id=result_student, dropped_id=result_dropped, added_id=result_added)
+        slots = slots.assign(student_id=slot_student, dropped_id=slot_dropped, r1_id=slot_repls[0], r2_id=slot_repls[1], r3_id=slot_repls[2])
+        add_prefs = add_prefs.assign(student_id=pref_student, added_id=pref_added)
+
+        def key(frame: pd.DataFrame, columns: List[str]) -> np.ndarray:
+            """Packs a student column followed by course columns into one int64 per row."""
+            packed = frame[columns[0] + "_id"].to_numpy()
+            for column in columns[1:]:
+                packed = packed * n_courses + frame[column + "_id"].to_numpy()
+            return packed
+
+        def isin(frame: pd.DataFrame, reference: pd.DataFrame, columns: List[str]) -> np.ndarray:
+            return np.isin(key(frame, columns), key(reference, columns))
+
+        def count(frame: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+            """Rows per distinct key, with the first sheet row and the key's values."""
+            return frame.groupby(key(frame, columns), sort=False).agg(
+                row=("row", "min"), n=("row", "size"), **{c: (c, "first") for c in columns})
+
+        def flag(check: str, frame: pd.DataFrame, course_column: str | None, describe: Callable[[pd.DataFrame], pd.Series]):
+            """Records each row of `frame` as a violation, with its detail message from `describe`."""
+            if len(frame):
+                found.append(pd.DataFrame({
+                    "Check": check,
+                    "Row": frame["row"] if "row" in frame else pd.NA,
+                    "Student ID": frame["student"] if "student" in frame else "",
+                    "Course": frame[course_column] if course_column else "",
+                    "Detail": describe(frame.astype(str)),
+                }))
+
+        known = result["student"].isin(reg["student_id"])
+        unknown = result[~known]
+        unknown = unknown.assign(course=unknown["dropped"].where(unknown["dropped"] != "", unknown["added"]))
+        flag("unknown_student", unknown, "course", lambda f:
+             "Student " + f["student"] + " not found in registration data.")
+        result = result[known]
+
+        is_add = (result["dropped"] == "") & (result["added"] != "")
+        is_swap = (result["dropped"] != "") & (result["added"] != "")
+        is_drop = (result["dropped"] != "") & (result["added"] == "")
+        drop_requested = isin(result, slots, ["student", "dropped"])
+
+        # Rows must match a request of the same kind
+        bad = result[is_add & ~isin(result, add_prefs, ["student", "added"])]
+        flag("invalid_assignment", bad, "added", lambda f:
+             "Student " + f["student"] + " was assigned '" + f["added"] + "', but this was not in their add preferences.")
+
+        bad = result[(is_swap | is_drop) & ~drop_requested]
+        flag("invalid_drop", bad, "dropped", lambda f:
+             "Student " + f["student"] + " dropped '" + f["dropped"] + "', but this was not a specified drop.")
+
+        replacements = pd.concat([
+            slots.loc[slots["conditional"], ["student_id", "dropped_id", repl + "_id"]].set_axis(["student_id", "dropped_id", "added_id"], axis=1)
+            for repl in ("r1", "r2", "r3")
+        ])
+        bad = result[is_swap & drop_requested & ~isin(result, replacements, ["student", "dropped", "added"])]
+        flag("swap_mismatch", bad, "added", lambda f:
+             "Student " + f["student"] + " swapped '" + f["dropped"] + "' for '" + f["added"]
+             + "', but this was not a replacement preference for that drop.")
+
+        unconditional = slots[~slots["conditional"]]
+        bad = result[is_drop & drop_requested & ~isin(result, unconditional, ["student", "dropped"])]
+        flag("drop_mismatch", bad, "dropped", lambda f:
+             "Student " + f["student"] + " dropped '" + f["dropped"] + "' without a replacement, but that drop listed replacements.")
+
+        # Counts per student must stay within what was requested
+        counts = count(result[result["added"] != ""], ["student", "added"])
+        bad = counts[counts["n"] > 1]
+        flag("duplicate_assignment", bad, "added", lambda f:
+             "Student " + f["student"] + " was assigned '" + f["added"] + "' " + f["n"] + " times.")
+
+        counts = count(result[result["dropped"] != ""], ["student", "dropped"])
+        requested = pd.Series(key(slots, ["student", "dropped"])).value_counts()
+        counts["requested"] = counts.index.map(requested).fillna(0).astype(np.int64)
+        bad = counts[counts["n"] > counts["requested"]]
+        flag("duplicate_drop", bad, "dropped", lambda f:
+             "Student " + f["student"] + " dropped '" + f["dropped"] + "' " + f["n"]
+             + " times, but requested it " + f["requested"] + " times.")
+
+        counts = count(result[is_add], ["student"])
+        allowed = reg["add_requests"].clip(lower=0).groupby(reg["student_id"]).sum()
+        counts["allowed"] = counts["student"].map(allowed).to_numpy()
+        bad = counts[counts["n"] > counts["allowed"]]
+        flag("too_many_adds", bad, None, lambda f:
+             "Student " + f["student"] + " got " + f["n"] + " adds, but requested "
+             + f["allowed"] + ".")
+
+        if self._seats_df is not None:
+            self._check_capacity(result, is_swap, is_drop, slots, flag, count)
+
+        if not found:
+            return pd.DataFrame(columns=VIOLATION_COLUMNS)
+        violations = pd.concat(found, ignore_index=True)
+        violations["Row"] = violations["Row"].astype("Int64")
+        return violations
+
+    def _check_capacity(self, result: pd.DataFrame, is_swap: pd.Series, is_drop: pd.Series, slots: pd.DataFrame,
+                        flag, count):
+        """
+        Seat checks of verify_invariants. As in the allocator, seats held by conditional
+        droppers count against a course's seats and unconditional drops free one each, so
+        a course may end with at most max(held by droppers, seats + unconditional drops).
+        """
+        codes = extract_course_codes(self._seats_df.iloc[:, [0]]).iloc[:, 0]
+        seats = pd.to_numeric(self._seats_df.iloc[:, 1], errors="coerce")
+        seats = pd.Series(seats.where(np.isfinite(seats), 0).astype(np.int64).to_numpy(), index=codes.to_numpy())
+        seats = seats[seats.index != "N/A"]
+        seats = seats[~seats.index.duplicated(keep="last")]
+
+        assigned = result[result["added"] != ""]
+        bad = assigned[~assigned["added"].isin(seats.index)]
+        flag("unknown_course", bad, "added", lambda f:
+             "Student " + f["student"] + " was assigned '" + f["added"] + "', which is not in the seat file.")
+
+        def per_course(values: pd.Series) -> pd.Series:
+            return values.value_counts().reindex(seats.index, fill_value=0)
+
+        dropper_held = per_course(slots.loc[slots["conditional"], "dropped"])
+        freed = per_course(result.loc[is_drop, "dropped"])
+        held = dropper_held - per_course(result.loc[is_swap, "dropped"]) + per_course(assigned["added"])
+        limit = np.maximum(dropper_held, seats + freed)
+        over = pd.DataFrame({"course": seats.index, "held": held, "limit": limit, "seats": seats, "freed": freed})
+        over = over[over["held"] > over["limit"]]
+        flag("capacity", over, "course", lambda f:
+             "Course " + f["course"] + " ends with " + f["held"] + " seats held, above its limit of " + f["limit"]
+             + " (" + f["seats"] + " seats, " + f["freed"] + " unconditional drops).")
+
+        expected = count(slots[~slots["conditional"] & slots["dropped"].isin(seats.index)].assign(row=0), ["student", "dropped"])
+        applied = count(result[is_drop], ["student", "dropped"])["n"]
+        expected["applied"] = expected.index.map(applied).fillna(0).astype(np.int64)
+        bad = expected[expected["applied"] < expected["n"]].drop(columns="row")
+        flag("missing_drop", bad, "dropped", lambda f:
+             "Student " + f["student"] + "'s unconditional drop of '" + f["dropped"] + "' is missing from the result.")
+
     def report(self):
         """Prints a summary of the verification results."""
         if self.discrepancies:
             print("\nVerification found the following discrepancies:")
             for d in self.discrepancies:
                 print(f"  - {d}")
+            if len(self.violations):
+                print("\nViolations by check:")
+                for check, count in self.violations["Check"].value_counts().items():
+                    print(f"  {check}: {count}")
         else:
             print("\nVerification complete. All result entries appear to be valid.")
\ No newline at end of file
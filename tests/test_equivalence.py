@@ -0,0 +1,47 @@
+import sys
+import os
+
+import pandas as pd
+import pytest
+
+# Adjust path to import from the src directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.allocator.processor import AddDropProcessor
+from src.benchmark.generator import WorkloadSpec, generate_workload
+from src.utils.events import EventLog, OFF
+from src.verifier.optimality import OptimalityChecker
+from src.verifier.verifier import ResultVerifier
+
+# Violations the original engine already produces: every occupant pointing to a free seat is
+# assigned in the same iteration, so a course can be overbooked and a student can get the same
+# course twice. The engines must agree on them; any other check failing is a regression.
+KNOWN_VIOLATIONS = {"capacity", "duplicate_assignment"}
+
+WORKLOADS = [
+    WorkloadSpec(n_students=400, n_courses=24, n_departments=departments, seed=seed)
+    for seed in (0, 1, 2) for departments in (1, 4)
+]
+
+
+def _processor(courses_df: pd.DataFrame, registrations_df: pd.DataFrame, **kwargs) -> AddDropProcessor:
+    return AddDropProcessor(courses_df, registrations_df, events=EventLog(console_level=OFF), **kwargs)
+
+
+@pytest.mark.parametrize("spec", WORKLOADS, ids=lambda s: f"seed{s.seed}-dept{s.n_departments}")
+def test_engines_agree(spec: WorkloadSpec):
+    courses_df, registrations_df = generate_workload(spec)
+    legacy = _processor(courses_df, registrations_df, engine="legacy").run()
+    indexed_processor = _processor(courses_df, registrations_df)
+    indexed = indexed_processor.run()
+    parallel = _processor(courses_df, registrations_df, workers=2).run()
+
+    assert not indexed.empty
+    pd.testing.assert_frame_equal(indexed, legacy)
+    pd.testing.assert_frame_equal(parallel, legacy)
+
+    verifier = ResultVerifier(registration_df=registrations_df, result_df=indexed, seats_df=courses_df)
+    verifier.verify(full=True)
+    assert set(verifier.violations["Check"]) <= KNOWN_VIOLATIONS
+
+    assert OptimalityChecker.from_processor(indexed_processor).check()
+    assert OptimalityChecker.from_result(courses_df, registrations_df, legacy).check()